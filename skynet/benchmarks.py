@@ -0,0 +1,312 @@
+'''A benchmark suite for the algorithm variants kept side by side in
+skynet.math, with baselines to catch regressions.
+
+Run it as python -m skynet.benchmarks, see --help for the options.
+'''
+
+from collections import namedtuple
+from itertools import islice
+from random import Random
+
+import argparse
+import json
+import platform
+import sys
+
+from skynet import profile
+from skynet.math import numbers, sequences
+
+# A variant of a family, which is only run on sizes up to its limit.
+Variant = namedtuple('Variant', ['function', 'limit'])
+
+# A family of variants of the same function. inputs maps a size to the
+# arguments every variant is called with, and default is the variant the
+# module's alias currently points to.
+Family = namedtuple('Family', ['name', 'variants', 'default', 'inputs', 'sizes'])
+
+def _over(function) :
+    '''Adapts a function to be called on each of a batch of argument tuples.'''
+
+    return lambda batch : [function(*args) for args in batch]
+
+def _listed(function) :
+    '''Adapts a function to return its results as a list.'''
+
+    return lambda *args : list(function(*args))
+
+def _first(generator) :
+    '''Adapts a generator function to return a list of its first count items.'''
+
+    return lambda count : list(islice(generator(), count))
+
+def _random_pairs(digits) :
+    '''Returns a batch of pairs of random numbers with the given number of
+    digits.'''
+
+    random = Random(digits)
+    return ([(random.randrange(10**(digits - 1), 10**digits),
+              random.randrange(10**(digits - 1), 10**digits)) for i in range(20)],)
+
+def _random_numbers(size) :
+    '''Returns a batch of random numbers between size and twice size.'''
+
+    random = Random(size)
+    return ([(random.randrange(size, 2 * size),) for i in range(20)],)
+
+unlimited = float('inf')
+
+families = [
+    Family(
+        'factorial',
+        {
+            'recursive_factorial' : Variant(numbers.recursive_factorial, 500),
+            'iterative_factorial' : Variant(numbers.iterative_factorial, unlimited),
+            'builtin_factorial' : Variant(numbers.builtin_factorial, unlimited),
+        },
+        'builtin_factorial',
+        lambda size : (size,),
+        (10, 100, 500, 5000),
+    ),
+    Family(
+        'gcd',
+        {
+            'recursive_gcd' : Variant(_over(numbers.recursive_gcd), 100),
+            'iterative_gcd' : Variant(_over(numbers.iterative_gcd), unlimited),
+            'binary_gcd' : Variant(_over(numbers.binary_gcd), unlimited),
+            'lehmer_gcd' : Variant(_over(numbers.lehmer_gcd), unlimited),
+            'builtin_gcd' : Variant(_over(numbers.builtin_gcd), unlimited),
+        },
+        'builtin_gcd',
+        _random_pairs,
+        (10, 100, 1000, 10000),
+    ),
+    Family(
+        'xgcd',
+        {
+            'recursive_xgcd' : Variant(_over(numbers.recursive_xgcd), 100),
+            'iterative_xgcd' : Variant(_over(numbers.iterative_xgcd), unlimited),
+        },
+        'iterative_xgcd',
+        _random_pairs,
+        (10, 100, 1000),
+    ),
+    Family(
+        'is_prime',
+        {
+            'is_prime_vanilla' : Variant(_over(numbers.is_prime_vanilla), 10**9),
+            'is_prime_6k1' : Variant(_over(numbers.is_prime_6k1), 10**9),
+            'is_prime_regex' : Variant(_over(numbers.is_prime_regex), 10**3),
+            'is_prime_miller_rabin' : Variant(_over(numbers.is_prime_miller_rabin),
+                                              unlimited),
+            'is_prime_miller_rabin_deterministic' : Variant(
+                _over(numbers.is_prime_miller_rabin_deterministic), unlimited
+            ),
+            'is_prime_baillie_psw' : Variant(_over(numbers.is_prime_baillie_psw),
+                                             unlimited),
+            'is_prime' : Variant(_over(numbers.is_prime), unlimited),
+        },
+        'is_prime',
+        _random_numbers,
+        (10**3, 10**6, 10**9, 10**18, 10**30),
+    ),
+    Family(
+        'primes_until',
+        {
+            'primes_until_odd_sieve' : Variant(_listed(sequences.primes_until_odd_sieve),
+                                               unlimited),
+            'primes_until_wheel' : Variant(_listed(sequences.primes_until_wheel),
+                                           unlimited),
+        },
+        'primes_until_wheel',
+        lambda size : (size,),
+        (10**4, 10**5, 10**6, 10**7),
+    ),
+    Family(
+        'primes_between',
+        {
+            'primes_between_bitmap' : Variant(_listed(sequences.primes_between_bitmap),
+                                              unlimited),
+            'primes_between_segmented' : Variant(
+                _listed(sequences.primes_between_segmented), unlimited
+            ),
+        },
+        'primes_between_segmented',
+        lambda size : (10**9, 10**9 + size),
+        (10**4, 10**5, 10**6),
+    ),
+    Family(
+        'prime_generator',
+        {
+            'prime_generator_incremental' : Variant(
+                _first(sequences.prime_generator_incremental), unlimited
+            ),
+            'prime_generator_segmented' : Variant(
+                _first(sequences.prime_generator_segmented), unlimited
+            ),
+        },
+        'prime_generator_segmented',
+        lambda size : (size,),
+        (10**3, 10**4, 10**5),
+    ),
+]
+
+def run(names = None, quick = False, log = None) :
+    '''Runs the benchmarks of the named families, or all of them, and returns
+    the results as {family : {size : [Measurement, ...]}}.
+
+    A quick run only takes the two smallest sizes, with shorter samples.
+    '''
+
+    options = {'repeat' : 3, 'min_time' : 0.01} if quick else {}
+    results = {}
+
+    for family in families :
+        if names is not None and family.name not in names :
+            continue
+
+        sizes = family.sizes[:2] if quick else family.sizes
+        results[family.name] = {}
+
+        for size in sizes :
+            variants = {name : variant.function
+                        for name, variant in family.variants.items()
+                        if size <= variant.limit}
+
+            measurements = profile.compare(variants, *family.inputs(size),
+                                           **options)
+            results[family.name][size] = measurements
+
+            if log is not None :
+                print("{} ({})".format(family.name, size), file = log)
+                print(profile.format_table(measurements), file = log)
+                print(file = log)
+
+    return results
+
+def as_baseline(results) :
+    '''Reduces results to the fastest time of each variant at each size, with
+    the platform they were taken on.'''
+
+    return {
+        'python' : platform.python_version(),
+        'machine' : platform.machine(),
+        'results' : {
+            family : {
+                str(size) : {m.name : m.min for m in measurements}
+                for size, measurements in sizes.items()
+            }
+            for family, sizes in results.items()
+        },
+    }
+
+def save_baseline(results, path) :
+    '''Writes the baseline of the given results to a JSON file.'''
+
+    with open(path, 'w') as f :
+        json.dump(as_baseline(results), f, indent = 2, sort_keys = True)
+
+def load_baseline(path) :
+    '''Reads a baseline written by save_baseline.'''
+
+    with open(path) as f :
+        return json.load(f)
+
+Regression = namedtuple('Regression', ['family', 'size', 'name', 'baseline',
+                                       'current'])
+
+def regressions(results, baseline, threshold = 0.1) :
+    '''Lists the variants which have become slower than in the baseline by
+    more than the given fraction.'''
+
+    found = []
+    baseline = baseline['results']
+
+    for family, sizes in results.items() :
+        for size, measurements in sizes.items() :
+            old = baseline.get(family, {}).get(str(size), {})
+
+            for m in measurements :
+                if m.name in old and m.min > old[m.name] * (1 + threshold) :
+                    found.append(Regression(family, size, m.name, old[m.name], m.min))
+
+    return found
+
+def recommendations(results) :
+    '''Lists the families whose default variant isn't the fastest at their
+    largest size, as (family, default, fastest) triples.'''
+
+    defaults = {family.name : family.default for family in families}
+    found = []
+
+    for family, sizes in results.items() :
+        # Only variants which run at every size are eligible as the default.
+        largest = sizes[max(sizes)]
+        fastest = largest[0].name
+
+        if fastest != defaults[family] :
+            found.append((family, defaults[family], fastest))
+
+    return found
+
+def main(arguments = None) :
+    '''Runs the suite from the command line. Returns 1 if there were
+    regressions, and 0 otherwise.'''
+
+    parser = argparse.ArgumentParser(prog = 'python -m skynet.benchmarks',
+                                     description = __doc__.split('\n\n')[0])
+    parser.add_argument('families', nargs = '*',
+                        help = 'the families to run, all by default: {}'.format(
+                            ', '.join(family.name for family in families)))
+    parser.add_argument('--quick', action = 'store_true',
+                        help = 'run only the smallest sizes, with shorter samples')
+    parser.add_argument('--baseline', metavar = 'PATH',
+                        help = 'a baseline to check for regressions against')
+    parser.add_argument('--save', metavar = 'PATH',
+                        help = 'save the results as a baseline')
+    parser.add_argument('--threshold', type = float, default = 0.1,
+                        help = 'the slowdown beyond which a variant has '
+                               'regressed, as a fraction (default 0.1)')
+    parser.add_argument('--json', action = 'store_true',
+                        help = 'print the results as JSON rather than tables')
+    options = parser.parse_args(arguments)
+
+    unknown = set(options.families) - {family.name for family in families}
+    if unknown :
+        parser.error("unknown families: {}".format(', '.join(sorted(unknown))))
+
+    results = run(options.families or None, options.quick,
+                  log = None if options.json else sys.stdout)
+
+    if options.json :
+        print(json.dumps({
+            family : {
+                str(size) : [m.as_dict() for m in measurements]
+                for size, measurements in sizes.items()
+            }
+            for family, sizes in results.items()
+        }, indent = 2))
+    else :
+        for family, default, fastest in recommendations(results) :
+            print("{}: {} is faster than the default, {}.".format(
+                family, fastest, default
+            ))
+
+    if options.save :
+        save_baseline(results, options.save)
+
+    if options.baseline :
+        found = regressions(results, load_baseline(options.baseline),
+                            options.threshold)
+
+        for r in found :
+            print("Regression in {} ({}): {} took {}, against {} before.".format(
+                r.family, r.size, r.name, profile._format_time(r.current),
+                profile._format_time(r.baseline)
+            ), file = sys.stderr)
+
+        return 1 if found else 0
+
+    return 0
+
+if __name__ == '__main__' :
+    sys.exit(main())
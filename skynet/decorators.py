@@ -1,14 +1,285 @@
+from collections import OrderedDict, namedtuple
 from functools import wraps
+from threading import Lock, RLock
 
-def memoize(function) :
-    function.cache = {}
+import os
+import pickle
+import sqlite3
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize',
+                                     'currsize'])
+
+# Separates the positional arguments from the keyword arguments in cache keys.
+_kwargs_marker = object()
+
+# Stands in for a missing cache entry, since None is a valid result.
+_missing = object()
+
+def _make_key(args, kwargs) :
+    '''Builds a cache key out of the arguments of a call with keyword
+    arguments.'''
+
+    return args + (_kwargs_marker,) + tuple(sorted(kwargs.items()))
+
+class PersistentCache(object) :
+    '''A store of function results in an sqlite database, which outlives the
+    process, and can be shared by several processes at once.
+
+    Results are keyed by the function's name, a version, which should be
+    changed whenever the function's results would, and its arguments. If
+    maxsize is given, only that many of the most recently stored results are
+    kept.
+    '''
+
+    # The version of the layout of the database.
+    format_version = 1
+
+    def __init__(self, path, maxsize = None) :
+        if maxsize is not None and maxsize < 1 :
+            raise ValueError("maxsize must be positive, got {}.".format(maxsize))
+
+        self.path = path
+        self.maxsize = maxsize
+        self.lock = Lock()
+        self.connection = None
+        self.pid = None
+
+    def _connect(self) :
+        '''Returns a connection to the database, making one if this process
+        doesn't have one yet.'''
+
+        # A connection inherited through fork can't be used.
+        if self.connection is None or self.pid != os.getpid() :
+            self.connection = sqlite3.connect(self.path, timeout = 60,
+                                              check_same_thread = False)
+            self.pid = os.getpid()
+
+            with self.connection :
+                self.connection.execute("PRAGMA journal_mode = WAL")
+
+                (version,), = self.connection.execute("PRAGMA user_version")
+                if version not in (0, self.format_version) :
+                    raise ValueError("{} is not a result cache.".format(self.path))
+
+                self.connection.execute("""CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    key BLOB NOT NULL,
+                    value BLOB NOT NULL,
+                    UNIQUE (name, version, key)
+                )""")
+                self.connection.execute(
+                    "PRAGMA user_version = {}".format(self.format_version)
+                )
+
+        return self.connection
+
+    def get(self, name, version, key, default = None) :
+        '''Returns the stored result for the given key, or default.'''
+
+        with self.lock :
+            row = self._connect().execute(
+                "SELECT value FROM results WHERE name = ? AND version = ? AND key = ?",
+                (name, str(version), pickle.dumps(key, 4))
+            ).fetchone()
+
+        return default if row is None else pickle.loads(row[0])
+
+    def set(self, name, version, key, value) :
+        '''Stores a result, evicting the oldest ones if there are too many.'''
+
+        with self.lock :
+            connection = self._connect()
+
+            with connection :
+                cursor = connection.execute(
+                    "INSERT OR REPLACE INTO results (name, version, key, value) "
+                    "VALUES (?, ?, ?, ?)",
+                    (name, str(version), pickle.dumps(key, 4), pickle.dumps(value, 4))
+                )
+
+                # Ids only grow, so the newest maxsize results are the ones
+                # with the last maxsize ids.
+                if self.maxsize is not None :
+                    connection.execute("DELETE FROM results WHERE id <= ?",
+                                       (cursor.lastrowid - self.maxsize,))
+
+    def clear(self, name = None) :
+        '''Removes all stored results, or only those of the named function.'''
+
+        with self.lock :
+            connection = self._connect()
+
+            with connection :
+                if name is None :
+                    connection.execute("DELETE FROM results")
+                else :
+                    connection.execute("DELETE FROM results WHERE name = ?", (name,))
+
+    def __len__(self) :
+        with self.lock :
+            (count,), = self._connect().execute("SELECT COUNT(*) FROM results")
+
+        return count
+
+    def close(self) :
+        '''Closes the connection to the database.'''
+
+        with self.lock :
+            if self.connection is not None and self.pid == os.getpid() :
+                self.connection.close()
+            self.connection = None
+
+def memoize(function = None, maxsize = None, persistent = None, version = 0) :
+    '''Decorates the given function to produce a caching version.
+
+    Can be used as @memoize, for an unbounded cache, or as @memoize(maxsize = n)
+    to keep only the n most recently used results.
+
+    If persistent is given, as a PersistentCache or the path to one, results
+    missing from memory are looked for there, and new ones are stored there, so
+    that they survive across runs. The version must be changed whenever the
+    function changes its results.
+    '''
+
+    if maxsize is not None and maxsize < 0 :
+        raise ValueError("maxsize must not be negative, got {}.".format(maxsize))
+
+    if isinstance(persistent, str) :
+        persistent = PersistentCache(persistent)
+
+    if function is None :
+        return lambda function : memoize(function, maxsize, persistent, version)
+
+    name = '{}.{}'.format(function.__module__, function.__qualname__)
+
+    cache = {} if maxsize is None else OrderedDict()
+    lock = Lock()
+
+    # Hits, misses and evictions. Hits are counted without the lock, so they
+    # may be slightly undercounted when several threads share the cache.
+    stats = [0, 0, 0]
 
     @wraps(function)
-    def memoized_function(*args) :
-        try :
-            return function.cache[args]
-        except KeyError :
-            function.cache[args] = function(*args)
-            return function.cache[args]
+    def memoized_function(*args, **kwargs) :
+        key = _make_key(args, kwargs) if kwargs else args
+
+        # Single lookups and moves are atomic, so hits don't need the lock. An
+        # entry evicted by another thread in between is a hit all the same.
+        result = cache.get(key, _missing)
+
+        if result is not _missing :
+            stats[0] += 1
+            if maxsize is not None :
+                try :
+                    cache.move_to_end(key)
+                except KeyError :
+                    pass
+            return result
+
+        if persistent is not None :
+            result = persistent.get(name, version, key, _missing)
+
+        # The lock isn't held during the call, so that recursive calls and
+        # other threads can proceed. Two threads may then compute the same
+        # result at once, but they'll agree on it.
+        if result is _missing :
+            result = function(*args, **kwargs)
+
+            if persistent is not None :
+                persistent.set(name, version, key, result)
+
+            miss = 1
+        else :
+            miss = 0
+
+        with lock :
+            stats[0] += 1 - miss
+            stats[1] += miss
+            cache[key] = result
+
+            if maxsize is not None and len(cache) > maxsize :
+                cache.popitem(last = False)
+                stats[2] += 1
+
+        return result
+
+    def cache_info() :
+        '''Reports the hits, misses and evictions so far, and the size of the
+        cache.'''
+
+        with lock :
+            return CacheInfo(stats[0], stats[1], stats[2], maxsize, len(cache))
+
+    def cache_clear() :
+        '''Empties the cache, including any persistent results, and resets its
+        statistics.'''
+
+        with lock :
+            cache.clear()
+            stats[:] = [0, 0, 0]
+
+            if persistent is not None :
+                persistent.clear(name)
+
+    memoized_function.cache = cache
+    memoized_function.cache_info = cache_info
+    memoized_function.cache_clear = cache_clear
+
+    return memoized_function
+
+def memoize_dense(function) :
+    '''Decorates a function of a single integer to produce a caching version,
+    which keeps its results in a list indexed by the argument.
+
+    Meant for recurrences over the non-negative integers, which only call
+    themselves with smaller arguments. Asking for an n beyond those known first
+    computes every value up to it, in order, so that the recursion never goes
+    more than a level deep. Negative arguments are passed straight through.
+    '''
+
+    table = []
+    lock = RLock()
+
+    # Hits and misses, counted as for memoize.
+    stats = [0, 0]
+
+    @wraps(function)
+    def memoized_function(n) :
+        if 0 <= n < len(table) :
+            stats[0] += 1
+            return table[n]
+
+        if n < 0 :
+            return function(n)
+
+        with lock :
+            while len(table) <= n :
+                i = len(table)
+                value = function(i)
+
+                # Unless a call for a larger argument already filled it in.
+                if len(table) == i :
+                    table.append(value)
+                    stats[1] += 1
+
+        return table[n]
+
+    def cache_info() :
+        '''Reports the hits and misses so far, and the size of the cache.'''
+
+        return CacheInfo(stats[0], stats[1], 0, None, len(table))
+
+    def cache_clear() :
+        '''Empties the cache, and resets its statistics.'''
+
+        with lock :
+            del table[:]
+            stats[:] = [0, 0]
+
+    memoized_function.cache = table
+    memoized_function.cache_info = cache_info
+    memoized_function.cache_clear = cache_clear
 
     return memoized_function
@@ -1,23 +1,238 @@
 '''Combinatorial functions.'''
 
-from functools import reduce
-from operator import mul
+from decimal import Decimal, localcontext
+from itertools import accumulate
+from math import isqrt, log, pi, sinh, sqrt
+from operator import add
 
-from skynet.decorators import memoize
+from skynet.decorators import memoize_dense
+from skynet.math import numbers
+from skynet.math.numbers import (crt, factorial_mod, factorial_table,
+                                 factorial_valuation, modular_inverse,
+                                 prime_factors, product_tree)
+from skynet.math.sequences import primes_until
+
+# Multiplies out the numerator and denominator, and divides once.
+def C_product(n, r) :
+    '''Computes the number of combinations of n items taken r at a time.'''
+
+    if r < 0 or r > n :
+        raise ValueError("Cannot choose {} items from {}".format(r, n))
+
+    r = min(r, n - r)
+    return product_tree(range(n - r + 1, n + 1)) // product_tree(range(2, r + 1))
+
+# Builds the result from its prime factorization, so that there are no huge
+# intermediates and no division at all. Needs a sieve up to n, so only pays off
+# once r is large.
+def C_prime_exponents(n, r) :
+    '''Computes the number of combinations of n items taken r at a time.'''
+
+    if r < 0 or r > n :
+        raise ValueError("Cannot choose {} items from {}".format(r, n))
+
+    root = isqrt(n)
+    powers = []
+
+    for p in primes_until(n) :
+        # Above the square root, each factorial has a single term in Legendre's
+        # formula, and the exponent is either 0 or 1.
+        if p > root :
+            e = n // p - r // p - (n - r) // p
+        else :
+            e = (factorial_valuation(n, p) - factorial_valuation(r, p)
+                 - factorial_valuation(n - r, p))
+
+        if e :
+            powers.append(p**e)
+
+    return product_tree(powers)
 
 def C(n, r) :
     '''Computes the number of combinations of n items taken r at a time.'''
 
     if r < 0 or r > n :
         raise ValueError("Cannot choose {} items from {}".format(r, n))
-    return reduce(mul, range(n - r + 1, n + 1), 1) // reduce(mul, range(1, r + 1), 1)
+
+    # Roughly where the sieve starts to pay for itself.
+    if min(r, n - r) > 16 * isqrt(n) :
+        return C_prime_exponents(n, r)
+
+    return C_product(n, r)
 
 def P(n, r) :
     '''Computes the number of permutations of n items taken r at a time.'''
 
     if r < 0 or r > n :
         raise ValueError("Cannot permute {} items from {}".format(r, n))
-    return reduce(mul, range(n - r + 1, n + 1), 1)
+    return product_tree(range(n - r + 1, n + 1))
+
+## Modular binomials
+
+def _binomial_mod_prime(n, r, p) :
+    '''Computes C(n, r) modulo the prime p.'''
+
+    result = 1
+
+    # By Lucas' theorem, C(n, r) is the product of the binomials of the base p
+    # digits of n and r.
+    while r :
+        a, b = n % p, r % p
+        if b > a :
+            return 0
+
+        if a <= numbers.factorial_table_limit :
+            factorials, inverses = factorial_table(p, a)
+            result = result * factorials[a] * inverses[b] * inverses[a - b] % p
+        else :
+            # Each factorial is a direct product beyond the tables, so one
+            # shared by both halves of the denominator is only computed once.
+            fb = factorial_mod(b, p)
+            fc = fb if a - b == b else factorial_mod(a - b, p)
+            result = result * factorial_mod(a, p) * modular_inverse(fb * fc, p) % p
+
+        n, r = n // p, r // p
+
+    return result
+
+# Tables of the products of all k up to i with p not dividing k, modulo q = p**e,
+# keyed by q, and extended as needed.
+unit_factorial_tables = {}
+
+def _unit_factorial_table(p, q, n) :
+    '''Returns the table of products of units modulo q = p**e, covering at
+    least every k up to n, which must be less than q.'''
+
+    table = unit_factorial_tables.setdefault(q, [1])
+    start = len(table)
+
+    if n >= start :
+        f = table[-1]
+        for k in range(start, min(max(n, 2 * start), q - 1) + 1) :
+            if k % p :
+                f = f * k % q
+            table.append(f)
+
+    return table
+
+def _unit_factorial_mod(n, p, q) :
+    '''Computes n! with every factor of p removed, modulo q = p**e.'''
+
+    # n! is made of (n // q) full runs of the units modulo q, a partial run,
+    # and the multiples of p, which contribute p**(n // p) * (n // p)!.
+    runs = []
+    while n > 1 :
+        runs.append((n // q, n % q))
+        n //= p
+
+    if not runs :
+        return 1
+
+    top = max(partial for full, partial in runs)
+    if top <= numbers.factorial_table_limit :
+        table = _unit_factorial_table(p, q, top)
+    else :
+        table = None
+
+    # The product of all units below q is -1, except for powers of 2 from 8 on.
+    sign = 1 if p == 2 and q >= 8 else -1
+
+    result = 1
+    for full, partial in runs :
+        if table is not None :
+            result = result * table[partial] % q
+        else :
+            for k in range(2, partial + 1) :
+                if k % p :
+                    result = result * k % q
+
+        if full % 2 :
+            result = result * sign % q
+
+    return result
+
+def _binomial_mod_prime_power(n, r, p, e) :
+    '''Computes C(n, r) modulo p**e, for the prime p.'''
+
+    q = p**e
+
+    # The exponent of p in C(n, r).
+    v = (factorial_valuation(n, p) - factorial_valuation(r, p)
+         - factorial_valuation(n - r, p))
+
+    if v >= e :
+        return 0
+
+    denominator = _unit_factorial_mod(r, p, q) * _unit_factorial_mod(n - r, p, q)
+    return _unit_factorial_mod(n, p, q) * modular_inverse(denominator, q) * p**v % q
+
+def _modulus_factors(m) :
+    '''Factorizes the modulus m into primes and corresponding exponents.'''
+
+    if m < 1 :
+        raise ValueError("Modulus must be positive, got {}.".format(m))
+
+    return list(prime_factors(m)) if m > 1 else []
+
+def _binomial_mod(n, r, factors) :
+    '''Computes C(n, r) modulo the number with the given prime factors.'''
+
+    residues, moduli = [], []
+
+    for p, e in factors :
+        if e == 1 :
+            residues.append(_binomial_mod_prime(n, r, p))
+        else :
+            residues.append(_binomial_mod_prime_power(n, r, p, e))
+        moduli.append(p**e)
+
+    return crt(residues, moduli)[0]
+
+def binomial_mod(n, r, m) :
+    '''Computes the number of combinations of n items taken r at a time, modulo
+    m.'''
+
+    if r < 0 or r > n :
+        raise ValueError("Cannot choose {} items from {}".format(r, n))
+
+    return _binomial_mod(n, r, _modulus_factors(m))
+
+def multinomial(counts, m = None) :
+    '''Computes the number of ways to divide (sum of counts) items into groups
+    of the given sizes, optionally modulo m.'''
+
+    counts = list(counts)
+
+    if any(k < 0 for k in counts) :
+        raise ValueError("Cannot form groups of negative sizes {}".format(counts))
+
+    # The product of the ways to choose each group from the items so far.
+    totals = accumulate(counts)
+
+    if m is None :
+        return product_tree(C(n, k) for n, k in zip(totals, counts))
+
+    factors = _modulus_factors(m)
+    result = 1 % m
+
+    for n, k in zip(totals, counts) :
+        result = result * _binomial_mod(n, k, factors) % m
+
+    return result
+
+def pascal_rows(m = None) :
+    '''Generates the rows of Pascal's triangle, optionally modulo m, each one
+    from the one before.'''
+
+    row = [1] if m is None else [1 % m]
+
+    while True :
+        yield row
+
+        if m is None :
+            row = [1, *map(add, row, row[1:]), 1]
+        else :
+            row = [1 % m, *((a + b) % m for a, b in zip(row, row[1:])), 1 % m]
 
 def next_permutation(items) :
     '''Returns the next lexicographical permutation of the given items.'''
@@ -44,7 +259,7 @@ def next_permutation(items) :
 
     return items
 
-@memoize
+@memoize_dense
 def number_of_partitions(n) :
     '''Counts the number of ways in which the given number can be expressed as
     the sum of positive integers.'''
@@ -66,3 +281,145 @@ def number_of_partitions(n) :
         total += (a + b) if k % 2 else -(a + b)
 
     return total
+
+def partitions_until(n, m = None) :
+    '''Computes the number of partitions of every number from 0 to n, optionally
+    modulo m, and returns them in a list.'''
+
+    if m is not None and m < 1 :
+        raise ValueError("Modulus must be positive, got {}.".format(m))
+
+    # The generalized pentagonal numbers, split by the sign they take in the
+    # recurrence.
+    plus, minus = [], []
+    k = 1
+    while k * (3*k - 1) // 2 <= n :
+        (plus if k % 2 else minus).extend((k * (3*k - 1) // 2, k * (3*k + 1) // 2))
+        k += 1
+
+    partitions = [1 if m is None else 1 % m] + [0] * max(n, 0)
+
+    # The number of pentagonal numbers of each sign that don't exceed i.
+    a = b = 0
+
+    for i in range(1, n + 1) :
+        while a < len(plus) and plus[a] <= i :
+            a += 1
+        while b < len(minus) and minus[b] <= i :
+            b += 1
+
+        total = (sum([partitions[i - g] for g in plus[:a]])
+                 - sum([partitions[i - g] for g in minus[:b]]))
+
+        partitions[i] = total if m is None else total % m
+
+    return partitions[:n + 1]
+
+def _decimal_pi(digits) :
+    '''Computes pi to the given number of digits as a Decimal, using Machin's
+    formula.'''
+
+    unity = 10 ** (digits + 10)
+
+    def arctan_inverse(x) :
+        total = term = unity // x
+        k, x2 = 1, x * x
+        while term :
+            term //= x2
+            k += 2
+            total += -(term // k) if k % 4 == 3 else term // k
+        return total
+
+    return Decimal(4 * (4 * arctan_inverse(5) - arctan_inverse(239))).scaleb(-digits - 10)
+
+def _decimal_cos(x) :
+    '''Computes the cosine of the Decimal x, to the current precision.'''
+
+    with localcontext() as context :
+        context.prec += 2
+        total, term, i, x2 = Decimal(1), Decimal(1), 0, x * x
+        while True :
+            i += 2
+            term = -term * x2 / (i * (i - 1))
+            if abs(term) < total.copy_abs().scaleb(-context.prec) or not term :
+                break
+            total += term
+
+    return +total
+
+def _rademacher_terms(n) :
+    '''Determines how many terms of Rademacher's series for the number of
+    partitions of n are needed to be sure of the nearest integer, using
+    Lehmer's bound on the remainder.'''
+
+    a = 44 * pi**2 / (225 * sqrt(3))
+    b = pi * sqrt(2) / 75
+    x = pi * sqrt(2 * n / 3)
+
+    N = 1
+    while x / N > 700 or (a / sqrt(N)
+                          + b * sqrt(N / (n - 1)) * sinh(x / N)) >= 0.25 :
+        N += 1
+
+    return N
+
+def partitions_rademacher(n) :
+    '''Computes the number of partitions of n using the Hardy-Ramanujan-
+    Rademacher formula.
+
+    Takes about O(n**(1/2)) terms of a series, each to a precision which falls
+    with its size, and so is far faster than the recurrence for a single large
+    n.
+    '''
+
+    if n < 0 :
+        return 0
+
+    if n < 2 :
+        return 1
+
+    c = 24 * n - 1
+    N = _rademacher_terms(n)
+
+    # The number of digits in p(n), and some to spare.
+    digits = int(pi * sqrt(2 * n / 3) / log(10)) + 15 + len(str(N))
+
+    with localcontext() as context :
+        context.prec = digits
+        decimal_pi = _decimal_pi(digits)
+        root_c = Decimal(c).sqrt()
+        total = Decimal(0)
+
+        for k in range(1, N + 1) :
+            # Each term need only be accurate to within a small fraction of 1,
+            # so its precision follows its size, which is about e**z.
+            z_estimate = pi * sqrt(c) / (6 * k)
+            precision = max(int(z_estimate / log(10)) + 15 + len(str(N)), 20)
+
+            with localcontext() as term_context :
+                term_context.prec = precision
+
+                # By Selberg's formula, A_k(n) is a sum over a few l mod 2k.
+                A = Decimal(0)
+                for l in range(2 * k) :
+                    if ((3*l*l + l) // 2 + n) % k == 0 :
+                        cos = _decimal_cos((6*l + 1) * +decimal_pi / (6 * k))
+                        A += -cos if l % 2 else cos
+
+                if not A :
+                    continue
+
+                A *= (Decimal(k) / 3).sqrt()
+
+                z = +decimal_pi * +root_c / (6 * k)
+                e = z.exp()
+                cosh_z, sinh_z = (e + 1 / e) / 2, (e - 1 / e) / 2
+                bessel = (2 / (+decimal_pi * z)).sqrt() * (cosh_z - sinh_z / z)
+
+                term = A / k * bessel
+
+            total += term
+
+        result = 2 * decimal_pi / Decimal(c) ** Decimal('0.75') * total
+
+    return int(result.to_integral_value())
@@ -1,12 +1,68 @@
 '''Tools for basic number theoretical manipulations.'''
 
+from array import array
 from functools import reduce
-from itertools import product
+from math import isqrt
+from heapq import merge
+from itertools import accumulate, product, takewhile
 from operator import mul
 from random import randint
 
 import re
 
+from skynet.math.sequences import primes_until, PrimeTable
+
+try :
+    import numpy
+except ImportError :
+    numpy = None
+
+## Products
+
+def _multiply_pairs(values) :
+    '''Multiplies adjacent pairs of the given values, carrying any odd one out
+    over as it is.'''
+
+    products = [values[i] * values[i + 1] for i in range(0, len(values) - 1, 2)]
+
+    if len(values) % 2 :
+        products.append(values[-1])
+
+    return products
+
+def _product_levels(values) :
+    '''Builds a product tree over the given values, returning a list of its
+    levels from the values themselves up to a single-element list holding their
+    product.
+    '''
+
+    levels = [list(values)]
+
+    while len(levels[-1]) > 1 :
+        levels.append(_multiply_pairs(levels[-1]))
+
+    return levels
+
+def product_tree(iterable) :
+    '''Computes the product of the given numbers, multiplying them in pairs up
+    a balanced tree.
+
+    Each multiplication is then between numbers of similar sizes, which
+    Karatsuba multiplication handles far better than a left to right product,
+    where an ever larger number is multiplied by a small one.
+    '''
+
+    values = list(iterable)
+
+    # Small numbers are still faster to multiply left to right, so the leaves
+    # are the products of runs of 16.
+    values = [reduce(mul, values[i:i + 16]) for i in range(0, len(values), 16)]
+
+    while len(values) > 1 :
+        values = _multiply_pairs(values)
+
+    return values[0] if values else 1
+
 ## Factorial
 
 # Implementation of standard recursive definition.
@@ -26,7 +82,7 @@ def iterative_factorial(n) :
     if n < 0 :
         raise ValueError("Factorial is not defined for negative values.")
 
-    return 1 if n == 0 else reduce(mul, range(1, n + 1), 1)
+    return product_tree(range(2, n + 1))
 
 # The fastest one is the one I didn't write, of course.
 from math import factorial as builtin_factorial
@@ -34,6 +90,110 @@ from math import factorial as builtin_factorial
 # Use the fastest one.
 factorial = builtin_factorial
 
+def factorial_valuation(n, p) :
+    '''Computes the exponent of the prime p in n!, by Legendre's formula.'''
+
+    total = 0
+
+    while n :
+        n //= p
+        total += n
+
+    return total
+
+## Modular Factorials
+
+# Tables of k! and 1/k! modulo primes, keyed by the prime, and extended as
+# needed. Tables are never extended past factorial_table_limit, beyond which the
+# products are computed directly instead.
+factorial_tables = {}
+factorial_table_limit = 10**7
+
+def factorial_table(p, n) :
+    '''Returns lists of k! and 1/k! modulo the prime p, for every k up to at
+    least n, which must be less than p.
+
+    The lists are cached, so that later calls for the same prime only need to
+    extend them.
+    '''
+
+    factorials, inverses = factorial_tables.setdefault(p, ([1], [1]))
+    start = len(factorials)
+
+    if n < start :
+        return factorials, inverses
+
+    # Grow geometrically, so that a series of increasing n takes linear time.
+    n = min(max(n, 2 * start), p - 1)
+
+    f = factorials[-1]
+    for k in range(start, n + 1) :
+        f = f * k % p
+        factorials.append(f)
+
+    # A single inverse, which is then walked back down the new part.
+    new = [0] * (n + 1 - start)
+    f = modular_inverse(factorials[n], p)
+    for k in range(n, start - 1, -1) :
+        new[k - start] = f
+        f = f * k % p
+    inverses.extend(new)
+
+    return factorials, inverses
+
+def _range_product_mod(start, stop, m) :
+    '''Computes the product of all numbers in range(start, stop) modulo m.'''
+
+    if numpy is not None and m <= 2**32 and stop - start > 4096 :
+        # Products of residues below 2**32 fit in 64 bits, so chunks are
+        # multiplied in pairs down to a single residue.
+        result = 1
+        for low in range(start, stop, 2**20) :
+            values = numpy.arange(low, min(low + 2**20, stop), dtype = numpy.uint64)
+            values %= m
+            while len(values) > 1 :
+                if len(values) % 2 :
+                    result = result * int(values[-1]) % m
+                    values = values[:-1]
+                values = values[0::2] * values[1::2] % m
+            result = result * int(values[0]) % m
+        return result
+
+    result = 1 % m
+    for k in range(start, stop) :
+        result = result * k % m
+
+    return result
+
+def factorial_mod(n, m) :
+    '''Computes the factorial of n modulo m.'''
+
+    if n < 0 :
+        raise ValueError("Factorial is not defined for negative values.")
+
+    if m < 1 :
+        raise ValueError("Modulus must be positive, got {}.".format(m))
+
+    # m divides n! outright.
+    if n >= m :
+        return 0
+
+    if m in factorial_tables and n < len(factorial_tables[m][0]) :
+        return factorial_tables[m][0][n]
+
+    if is_prime(m) :
+        # By Wilson's theorem, n! * (m - 1 - n)! == (-1)**(m - n) (mod m), so
+        # only the smaller of the two need be computed.
+        k = m - 1 - n
+        if k < n :
+            inverse = modular_inverse(factorial_mod(k, m), m)
+            return inverse if (m - n) % 2 == 0 else (m - inverse) % m
+
+        if n <= factorial_table_limit :
+            return factorial_table(m, n)[0][n]
+
+    return _range_product_mod(2, n + 1, m)
+
 ## GCD
 
 def recursive_gcd(m, n) :
@@ -49,7 +209,65 @@ def iterative_gcd(m, n) :
 
     return m
 
-_gcd = iterative_gcd
+# Stein's algorithm, trading divisions for shifts and subtractions.
+def binary_gcd(m, n) :
+    '''Computes the GCD (Greatest Common Divisor) of two numbers.'''
+
+    m, n = abs(m), abs(n)
+
+    if m == 0 or n == 0 :
+        return m | n
+
+    # The power of two common to both.
+    shift = ((m | n) & -(m | n)).bit_length() - 1
+
+    m >>= (m & -m).bit_length() - 1
+    while n :
+        n >>= (n & -n).bit_length() - 1
+        if m > n :
+            m, n = n, m
+        n -= m
+
+    return m << shift
+
+# Lehmer's algorithm. Runs Euclid's algorithm on the leading 64 bits alone for
+# as long as the quotients are certain to match the full ones, and only then
+# applies all the steps taken to the full numbers at once. Several times faster
+# than iterative_gcd on numbers with thousands of digits.
+def lehmer_gcd(m, n) :
+    '''Computes the GCD (Greatest Common Divisor) of two numbers.'''
+
+    m, n = abs(m), abs(n)
+
+    if m < n :
+        m, n = n, m
+
+    while n >> 64 :
+        shift = m.bit_length() - 64
+        x, y = m >> shift, n >> shift
+
+        A, B, C, D = 1, 0, 0, 1
+        while y + C and y + D :
+            q = (x + A) // (y + C)
+            if q != (x + B) // (y + D) :
+                break
+
+            A, C = C, A - q*C
+            B, D = D, B - q*D
+            x, y = y, x - q*y
+
+        if B == 0 :
+            m, n = n, m % n
+        else :
+            m, n = A*m + B*n, C*m + D*n
+
+    return iterative_gcd(m, n)
+
+# The builtin gcd is Lehmer's algorithm again, written in C, and beats all of
+# the above by an order of magnitude.
+from math import gcd as builtin_gcd
+
+_gcd = builtin_gcd
 
 def chained_gcd(*numbers) :
     '''Computes the GCD (Greatest Common Divisor) of two or more numbers.'''
@@ -82,6 +300,51 @@ def chained_lcm(*numbers) :
 
 lcm = chained_lcm
 
+def lcm_range(n) :
+    '''Computes the LCM (Least Common Multiple) of all numbers from 1 to n.'''
+
+    if n < 0 :
+        raise ValueError("lcm_range is not defined for negative values.")
+
+    # The largest power of each prime that doesn't exceed n.
+    powers = []
+    for p in primes_until(n) :
+        power = p
+        while power * p <= n :
+            power *= p
+        powers.append(power)
+
+    return product_tree(powers)
+
+## Batch GCD
+
+def batch_gcd(values) :
+    '''Computes the GCD of each of the given positive numbers with the product
+    of all the others, returning them in a list.
+
+    Uses Bernstein's product and remainder trees, so that the product of all
+    the values is never divided by a single small value. Instead, it is reduced
+    down the tree modulo the squares of products of ever fewer values.
+    '''
+
+    values = list(values)
+
+    if any(x < 1 for x in values) :
+        raise ValueError("Batch GCD is only defined for positive values.")
+
+    if len(values) < 2 :
+        return [1] * len(values)
+
+    levels = _product_levels(values)
+
+    # Reduce the product of everything modulo the square of each node, top down.
+    remainders = levels[-1]
+    for level in reversed(levels[:-1]) :
+        remainders = [remainders[i // 2] % (x * x) for i, x in enumerate(level)]
+
+    # Here r == x * (product of the others mod x).
+    return [builtin_gcd(r // x, x) for r, x in zip(remainders, values)]
+
 ## Extended GCD
 
 def recursive_xgcd(m, n) :
@@ -123,6 +386,132 @@ def modular_inverse(a, m) :
 
     return x % m
 
+def batch_modular_inverse(values, m) :
+    '''Determines the modular inverses of all the given values with respect to
+    m, using Montgomery's trick.
+
+    Only a single extended GCD is needed, along with 3 multiplications for
+    every other value.
+    '''
+
+    values = [a % m for a in values]
+    if not values :
+        return []
+
+    # prefix[i] is the product of the first i + 1 values.
+    prefix = list(accumulate(values, lambda x, y : x * y % m))
+
+    try :
+        inverse = modular_inverse(prefix[-1], m)
+    except ValueError :
+        # Report the first value that actually has no inverse.
+        for a in values :
+            modular_inverse(a, m)
+        raise
+
+    # Peel the values off the inverse of the whole product, one at a time.
+    inverses = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1) :
+        inverses[i] = inverse * prefix[i - 1] % m
+        inverse = inverse * values[i] % m
+    inverses[0] = inverse
+
+    return inverses
+
+## Chinese Remainder Theorem
+
+def crt(residues, moduli) :
+    '''Finds x such that x is congruent to each residue modulo the
+    corresponding modulus. The moduli need not be pairwise coprime.
+
+    Returns (x, m), where m is the LCM of the moduli and x is the unique
+    solution in [0, m). Raises ValueError if the congruences are inconsistent.
+    '''
+
+    residues, moduli = list(residues), list(moduli)
+
+    if len(residues) != len(moduli) :
+        raise ValueError("Got {} residues, but {} moduli.".format(
+            len(residues), len(moduli)
+        ))
+
+    x, m = 0, 1
+
+    for a, n in zip(residues, moduli) :
+        # With p*m + q*n == g, x + (a - x)/g * p*m solves both congruences.
+        p, q, g = xgcd(m, n)
+
+        if (a - x) % g :
+            raise ValueError("No solution, as {} != {} (mod gcd({}, {}) == {})."
+                             .format(x % g, a % g, m, n, g))
+
+        x += (a - x) // g * p % (n // g) * m
+        m = m // g * n
+        x %= m
+
+    return (x, m)
+
+## Modular Arithmetic
+
+class ModContext(object) :
+    '''Arithmetic modulo a fixed n, for when many operations share the same
+    modulus.
+
+    Whatever depends only on n, such as the decomposition of n - 1 used by the
+    Miller-Rabin test, is computed once on construction.
+    '''
+
+    def __init__(self, n) :
+        if n < 1 :
+            raise ValueError("Modulus must be positive, got {}.".format(n))
+
+        self.n = n
+
+        # Express n - 1 in the form u * 2 ** t
+        self.t, self.u = _miller_rabin_decompose(n) if n > 1 else (0, 0)
+
+    def reduce(self, a) :
+        '''Returns the least non-negative residue of a.'''
+
+        return a % self.n
+
+    def mul(self, a, b) :
+        '''Returns a * b modulo n.'''
+
+        return a * b % self.n
+
+    def square(self, a) :
+        '''Returns a ** 2 modulo n.'''
+
+        return a * a % self.n
+
+    def pow(self, a, e) :
+        '''Returns a ** e modulo n. Negative exponents raise the modular inverse
+        of a, and so raise ValueError if it doesn't exist.
+        '''
+
+        if e < 0 :
+            return pow(modular_inverse(a, self.n), -e, self.n)
+
+        return pow(a, e, self.n)
+
+    def pow_many(self, bases, e) :
+        '''Returns a list of a ** e modulo n for each of the given bases.'''
+
+        n = self.n
+
+        if e < 0 :
+            bases, e = batch_modular_inverse(bases, n), -e
+
+        return [pow(a, e, n) for a in bases]
+
+    def is_witness(self, a) :
+        '''Determines if a is a Miller-Rabin witness to the compositeness of n,
+        which must be odd and greater than 2.
+        '''
+
+        return miller_rabin_witness(a, self.n, self.t, self.u)
+
 ## Primality Testing
 
 # Deterministic Algorithms.
@@ -131,6 +520,25 @@ def modular_inverse(a, m) :
 prime_cache = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41,
                43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97]
 
+# A table of primes, shared with other processes through a memory map, and
+# consulted by the primality tests for every number it covers. See
+# load_prime_table.
+prime_table = None
+
+def load_prime_table(path) :
+    '''Opens a prime table written by save_prime_table, and makes the
+    primality tests use it for every number it covers.'''
+
+    global prime_table
+
+    prime_table = PrimeTable(path)
+    return prime_table
+
+def _in_prime_table(n) :
+    '''Determines if the loaded prime table covers n.'''
+
+    return prime_table is not None and n <= prime_table.limit
+
 # Standard test, checks every factor to the square root.
 def is_prime_vanilla(n) :
     '''Tests if the given number is prime.'''
@@ -184,18 +592,21 @@ def miller_rabin_witness(a, n, t, u) :
 
     x = pow(a, u, n)
 
-    for i in range(t) :
-        y = x*x % n
+    if x == 1 or x == n - 1 :
+        return False
 
-        if y == 1 and x != 1 and x != n - 1 :
-            return True
+    # Reaching -1 means every later square is 1, as it should be. Reaching 1
+    # first means the previous value was a non-trivial square root of 1.
+    for i in range(t - 1) :
+        x = x*x % n
 
-        x = y
+        if x == n - 1 :
+            return False
 
-    if y != 1 :
-        return True
+        if x == 1 :
+            return True
 
-    return False
+    return True
 
 def is_prime_miller_rabin(n, s = 25) :
     '''Tests if the given number is prime.'''
@@ -203,24 +614,191 @@ def is_prime_miller_rabin(n, s = 25) :
     if n < 2 :
         return False
 
+    if _in_prime_table(n) :
+        return n in prime_table
+
     if n in prime_cache :
         return True
 
     if any((n % i) == 0 for i in prime_cache) :
         return False
 
-    # Express n - 1 in the form u * 2 ** t
-    b = bin(n - 1)[2:]
-    u = b.rstrip('0')
-    t = len(b) - len(u)
-    u = int(u, 2)
-
     # Ask each witness.
-    return not any(miller_rabin_witness(randint(2, n - 1), n, t, u) for i in range(s))
+    context = ModContext(n)
+    return not any(context.is_witness(randint(2, n - 1)) for i in range(s))
+
+# Deterministic variants of the probabilistic algorithms.
+
+# The product of all the cached primes, so that a single gcd replaces a trial
+# division by each of them.
+prime_cache_product = reduce(mul, prime_cache, 1)
+
+def _has_small_factor(n) :
+    '''Determines if n is divisible by a cached prime other than itself.'''
+
+    return builtin_gcd(n, prime_cache_product) != 1 and n not in prime_cache
+
+# Minimal sets of Miller-Rabin witnesses, each of which is known to be correct
+# for all numbers below the corresponding bound.
+miller_rabin_witnesses = [
+    (2047, (2,)),
+    (1373653, (2, 3)),
+    (25326001, (2, 3, 5)),
+    (3215031751, (2, 3, 5, 7)),
+    (2152302898747, (2, 3, 5, 7, 11)),
+    (3474749660383, (2, 3, 5, 7, 11, 13)),
+    (341550071728321, (2, 3, 5, 7, 11, 13, 17)),
+    (3825123056546413051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318665857834031151167461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3317044064679887385961981, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37,
+                                 41)),
+]
+
+def _miller_rabin_decompose(n) :
+    '''Expresses n - 1 in the form u * 2 ** t, returning (t, u).'''
+
+    u = n - 1
+    t = (u & -u).bit_length() - 1
+    return t, u >> t
+
+def jacobi(a, n) :
+    '''Computes the Jacobi symbol (a / n), for odd positive n.'''
+
+    if n <= 0 or n % 2 == 0 :
+        raise ValueError("Jacobi symbol is not defined for n = {}.".format(n))
+
+    a %= n
+    result = 1
+
+    while a :
+        while a % 2 == 0 :
+            a //= 2
+            if n % 8 in (3, 5) :
+                result = -result
+
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3 :
+            result = -result
+
+        a %= n
+
+    return result if n == 1 else 0
+
+def is_strong_lucas_probable_prime(n) :
+    '''Tests if the odd number n is a strong Lucas probable prime, with the
+    parameters chosen by Selfridge's method.
+    '''
+
+    if n == 2 :
+        return True
+
+    if n < 2 or n % 2 == 0 :
+        return False
+
+    # No suitable D exists for squares, so the search below wouldn't end.
+    root = isqrt(n)
+    if root * root == n :
+        return False
+
+    D = 5
+    while True :
+        j = jacobi(D, n)
+        if j == -1 :
+            break
+        if j == 0 and abs(D) != n :
+            return False
+        D = -D - 2 if D > 0 else -D + 2
+
+    P, Q = 1, (1 - D) // 4
+
+    # Express n + 1 in the form d * 2 ** s
+    d = n + 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+
+    # Compute U(d), V(d) and Q**d, moving left to right along the bits of d.
+    U, V, Qk = 1, P, Q % n
+    for bit in bin(d)[3:] :
+        U, V = U * V % n, (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+
+        if bit == '1' :
+            U, V = P * U + V, D * U + P * V
+            if U % 2 :
+                U += n
+            if V % 2 :
+                V += n
+            U, V = (U // 2) % n, (V // 2) % n
+            Qk = Qk * Q % n
+
+    if U == 0 or V == 0 :
+        return True
+
+    for r in range(1, s) :
+        V = (V * V - 2 * Qk) % n
+        if V == 0 :
+            return True
+        Qk = Qk * Qk % n
+
+    return False
+
+def is_prime_baillie_psw(n) :
+    '''Tests if the given number is prime, using the Baillie-PSW test.
+
+    No composite number passing this test is known.
+    '''
+
+    if n < 2 :
+        return False
+
+    if _has_small_factor(n) :
+        return False
+
+    if n in prime_cache or n < 10201 :
+        return True
+
+    t, u = _miller_rabin_decompose(n)
+    if miller_rabin_witness(2, n, t, u) :
+        return False
+
+    return is_strong_lucas_probable_prime(n)
+
+def is_prime_miller_rabin_deterministic(n) :
+    '''Tests if the given number is prime.
+
+    Uses the smallest known sufficient set of Miller-Rabin witnesses where
+    there is one, and the Baillie-PSW test for larger numbers.
+    '''
+
+    if n < 2 :
+        return False
+
+    if _in_prime_table(n) :
+        return n in prime_table
+
+    if _has_small_factor(n) :
+        return False
+
+    # Anything left below the square of the next prime has no factors.
+    if n in prime_cache or n < 10201 :
+        return True
+
+    for bound, witnesses in miller_rabin_witnesses :
+        if n < bound :
+            break
+    else :
+        return is_prime_baillie_psw(n)
+
+    context = ModContext(n)
+    return not any(context.is_witness(a) for a in witnesses)
 
 def is_prime(n) :
     '''Tests if the given number is prime.'''
-    return is_prime_miller_rabin(n) if n >> 25 else is_prime_6k1(n)
+
+    if _in_prime_table(n) :
+        return n in prime_table
+
+    return is_prime_miller_rabin_deterministic(n) if n >> 25 else is_prime_6k1(n)
 
 is_prime_deterministic = is_prime_6k1
 
@@ -254,7 +832,302 @@ def prime_factors_trial_division(n) :
 
     return
 
-prime_factors = prime_factors_trial_division
+# Sub-exponential methods, for numbers which trial division can't touch.
+
+# Primes used for the trial division stage of the hybrid factorizer. Any
+# cofactor left below the square of the bound is known to be prime.
+trial_division_bound = 1000
+trial_division_primes = primes_until(trial_division_bound)
+
+def pollard_brent(n, c = 1, limit = 2**20) :
+    '''Finds a non-trivial factor of the composite number n, using Brent's
+    variant of Pollard's rho method with the polynomial x**2 + c.
+
+    Returns None if no factor was found within limit iterations.
+    '''
+
+    if n % 2 == 0 :
+        return 2
+
+    y, r, q, g = 2, 1, 1, 1
+    block = 128
+
+    while g == 1 :
+        x = y
+        for i in range(r) :
+            y = (y*y + c) % n
+
+        k = 0
+        while k < r and g == 1 :
+            ys = y
+            for i in range(min(block, r - k)) :
+                y = (y*y + c) % n
+                q = q * abs(x - y) % n
+
+            g = builtin_gcd(q, n)
+            k += block
+
+        r <<= 1
+        if r > limit :
+            break
+
+    if g == n :
+        # The batched product overshot, so backtrack one step at a time.
+        g = 1
+        while g == 1 :
+            ys = (ys*ys + c) % n
+            g = builtin_gcd(abs(x - ys), n)
+
+    return g if 1 < g < n else None
+
+# Arithmetic on Montgomery curves, in projective (X : Z) coordinates.
+
+def _ecm_add(p, q, difference, n) :
+    '''Adds the points p and q, given their difference p - q.'''
+
+    u = (p[0] - p[1]) * (q[0] + q[1])
+    v = (p[0] + p[1]) * (q[0] - q[1])
+    return (difference[1] * (u + v)**2 % n, difference[0] * (u - v)**2 % n)
+
+def _ecm_double(p, a24, n) :
+    '''Doubles the point p, on the curve with constant a24 = (A + 2) / 4.'''
+
+    s = (p[0] + p[1])**2 % n
+    d = (p[0] - p[1])**2 % n
+    t = s - d
+    return (s * d % n, t * (d + a24 * t) % n)
+
+def _ecm_multiply(k, p, a24, n) :
+    '''Computes k * p using the Montgomery ladder.'''
+
+    if k == 1 :
+        return p
+
+    r, s = p, _ecm_double(p, a24, n)
+    for bit in bin(k)[3:] :
+        if bit == '1' :
+            r, s = _ecm_add(s, r, p, n), _ecm_double(s, a24, n)
+        else :
+            r, s = _ecm_double(r, a24, n), _ecm_add(s, r, p, n)
+
+    return r
+
+def ecm(n, B1 = 2000, B2 = None, curves = 25, seed = 6) :
+    '''Finds a non-trivial factor of the composite number n, using Lenstra's
+    elliptic curve method, with Montgomery curves in Suyama's parametrization.
+
+    Tries the given number of curves with stage one bound B1 and stage two
+    bound B2, and returns None if none of them succeed.
+    '''
+
+    if B2 is None :
+        B2 = 100 * B1
+
+    small_primes = primes_until(B1 + 1)
+    large_primes = primes_until(B2 + 1)[len(small_primes):]
+
+    for sigma in range(seed, seed + curves) :
+        # Suyama's parametrization gives a curve with a point of known
+        # coordinates, and a group order divisible by 12.
+        u = (sigma * sigma - 5) % n
+        v = 4 * sigma % n
+        x, z = pow(u, 3, n), pow(v, 3, n)
+
+        numerator = pow(v - u, 3, n) * (3*u + v) % n
+        denominator = 16 * x * v % n
+
+        g = builtin_gcd(denominator, n)
+        if g == n :
+            continue
+        if g != 1 :
+            return g
+
+        a24 = numerator * modular_inverse(denominator, n) % n
+
+        # Stage one : multiply by every prime power up to B1.
+        q = (x, z)
+        for p in small_primes :
+            power = p
+            while power * p <= B1 :
+                power *= p
+            q = _ecm_multiply(power, q, a24, n)
+
+        g = builtin_gcd(q[1], n)
+        if g == n :
+            continue
+        if 1 < g :
+            return g
+
+        # Stage two : look for a single prime between B1 and B2, using the
+        # standard continuation with precomputed multiples of 2*q.
+        D = 100
+        steps = [None] * (D + 1)
+        steps[1] = _ecm_double(q, a24, n)
+        steps[2] = _ecm_double(steps[1], a24, n)
+        for d in range(3, D + 1) :
+            steps[d] = _ecm_add(steps[d - 1], steps[1], steps[d - 2], n)
+        beta = [s and s[0] * s[1] % n for s in steps]
+
+        base = B1 - 1 if B1 % 2 == 0 else B1
+        r = _ecm_multiply(base, q, a24, n)
+        t = _ecm_multiply(base - 2*D, q, a24, n) if base > 2*D else None
+        if t is None :
+            continue
+
+        g = 1
+        index = 0
+        for start in range(base, B2, 2*D) :
+            alpha = r[0] * r[1] % n
+            while index < len(large_primes) and large_primes[index] <= start + 2*D :
+                delta = (large_primes[index] - start) // 2
+                s = steps[delta]
+                g = g * ((r[0] - s[0]) * (r[1] + s[1]) - alpha + beta[delta]) % n
+                index += 1
+
+            r, t = _ecm_add(r, steps[D], t, n), r
+
+        g = builtin_gcd(g, n)
+        if 1 < g < n :
+            return g
+
+    return None
+
+def _find_factor(n) :
+    '''Finds a non-trivial factor of the composite number n.'''
+
+    # Rho and ECM are hopeless on prime powers, so they are picked out first.
+    for k in primes_until(n.bit_length()) :
+        if k == 3 and not cube_residues_63[n % 63] :
+            continue
+
+        root = integer_nth_root(n, k)
+        if root**k == n :
+            return root
+
+    for c in range(1, 4) :
+        d = pollard_brent(n, c)
+        if d is not None :
+            return d
+
+    B1, seed = 2000, 6
+    while True :
+        d = ecm(n, B1, curves = 25, seed = seed)
+        if d is not None :
+            return d
+
+        B1 *= 5
+        seed += 25
+
+def prime_factors_hybrid(n) :
+    '''Factorizes a number into prime factors and corresponding exponents.
+
+    Small factors are removed by trial division, medium ones by Pollard-Brent
+    rho, and anything left over by the elliptic curve method.
+    '''
+
+    if n < 1 :
+        raise ValueError("Cannot factorize {}.".format(n))
+
+    if n == 1 :
+        yield (1, 1)
+        return
+
+    factors = {}
+
+    for p in trial_division_primes :
+        if p * p > n :
+            break
+
+        exponent = 0
+        while n % p == 0 :
+            exponent += 1
+            n //= p
+
+        if exponent :
+            factors[p] = exponent
+
+    cofactors = [n] if n != 1 else []
+
+    while cofactors :
+        m = cofactors.pop()
+
+        if m < trial_division_bound ** 2 or is_prime(m) :
+            factors[m] = factors.get(m, 0) + 1
+            continue
+
+        d = _find_factor(m)
+        cofactors.extend((d, m // d))
+
+    for p in sorted(factors) :
+        yield (p, factors[p])
+
+# Table lookups, for bulk factorization of many small numbers.
+
+# The smallest prime factor of every number up to some bound, as built by
+# build_spf_table. Primes are stored as 0, so no entry exceeds the square root
+# of the bound, and two bytes per number are enough below 2**32.
+spf_table = None
+
+def build_spf_table(n) :
+    '''Builds a table of the smallest prime factor of every number up to n,
+    and makes prime_factors use it for every number it covers.
+
+    Returns the table, which is a numpy array if numpy is available, and an
+    array.array otherwise.
+    '''
+
+    global spf_table
+
+    wide = n >= 2**32
+    root = isqrt(n)
+
+    if numpy is not None :
+        table = numpy.zeros(n + 1, dtype = numpy.uint32 if wide else numpy.uint16)
+    else :
+        table = array('I' if wide else 'H', bytes((4 if wide else 2) * (n + 1)))
+
+    # Larger primes go first, so that smaller ones overwrite them.
+    for p in reversed(primes_until(root + 1)) :
+        if numpy is not None :
+            table[p*p::p] = p
+        else :
+            table[p*p::p] = array(table.typecode, [p]) * len(range(p*p, n + 1, p))
+
+    spf_table = table
+    return table
+
+def prime_factors_spf(n, table = None) :
+    '''Factorizes a number into prime factors and corresponding exponents,
+    using a table of smallest prime factors which must cover n.'''
+
+    if table is None :
+        table = spf_table
+
+    if n == 1 :
+        yield (1, 1)
+        return
+
+    while n != 1 :
+        p = int(table[n]) or n
+
+        exponent = 0
+        while n % p == 0 :
+            exponent += 1
+            n //= p
+
+        yield (p, exponent)
+
+def prime_factors(n) :
+    '''Factorizes a number into prime factors and corresponding exponents.
+
+    Uses the smallest prime factor table if one has been built and covers n,
+    and prime_factors_hybrid otherwise.
+    '''
+
+    if spf_table is not None and 0 < n < len(spf_table) :
+        return prime_factors_spf(n, spf_table)
+
+    return prime_factors_hybrid(n)
 
 def divisors_cartesian_product(n) :
     '''Generates all the divisors of the given number. Does not yield in order.'''
@@ -271,6 +1144,74 @@ def divisors_cartesian_product(n) :
 
 divisors = divisors_cartesian_product
 
+def divisors_sorted(n, limit = None) :
+    '''Generates the divisors of the given number in ascending order, stopping
+    after the ones up to limit if it is given.'''
+
+    if limit is None :
+        limit = n
+
+    # The divisors made of each prime power in turn are merged in order from
+    # sorted lists, leaving out anything above the limit. The last merge is
+    # left lazy, so nothing is done past the divisors actually consumed.
+    factors = sorted(prime_factors(n), key = lambda f : f[0]**f[1])
+    if n == 1 :
+        factors = []
+
+    found = [1]
+    last = len(factors) - 1
+
+    for index, (p, e) in enumerate(factors) :
+        runs = []
+        power = 1
+        for i in range(e + 1) :
+            if power > limit :
+                break
+            runs.append(takewhile(limit.__ge__, map(power.__mul__, found)))
+            power *= p
+
+        merged = merge(*runs)
+        if index == last :
+            yield from merged
+            return
+
+        found = list(merged)
+
+    yield from (d for d in found if d <= limit)
+
+def divisors_sieve(n) :
+    '''Returns a list of the sorted lists of divisors of every number up to n,
+    in O(n log n) time.'''
+
+    lists = [[] for i in range(n + 1)]
+
+    for d in range(1, n + 1) :
+        for multiple in range(d, n + 1, d) :
+            lists[multiple].append(d)
+
+    return lists
+
+def sigma_sieve(n, k = 1) :
+    '''Returns the sum of the kth powers of the divisors of every number up to
+    n, as a sequence indexed by the number, in O(n log n) time.
+
+    The sequence is a numpy array if numpy is available, in which case the
+    sums must fit in 64 bits, and a list otherwise.
+    '''
+
+    if numpy is not None :
+        table = _multiplicative_table(max(n, 1), _sigma_update(k))[:n + 1]
+        table[0] = 0
+        return table
+
+    sums = [0] * (n + 1)
+
+    for d in range(1, n + 1) :
+        dk = d**k
+        sums[d::d] = [s + dk for s in sums[d::d]]
+
+    return sums
+
 ## Multiplicative functions.
 
 def phi(n) :
@@ -305,23 +1246,112 @@ def tau(n) :
 
 ## Digits, and related.
 
-def digits(n) :
+def digits_string(n) :
     '''Returns the sequence of digits of the given number.'''
 
     return tuple(int(i) for i in str(n))
 
-def is_palindrome(n) :
+def _check_digits(n, base) :
+    '''Raises ValueError unless n has digits in the given base.'''
+
+    if n < 0 :
+        raise ValueError("Digits are not defined for negative values.")
+
+    if base < 2 :
+        raise ValueError("Base must be at least 2, got {}.".format(base))
+
+def digits_arithmetic(n, base = 10) :
+    '''Returns the sequence of digits of the given number in the given base,
+    most significant first.'''
+
+    _check_digits(n, base)
+
+    if n == 0 :
+        return (0,)
+
+    d = []
+    while n :
+        n, r = divmod(n, base)
+        d.append(r)
+
+    return tuple(reversed(d))
+
+digits = digits_arithmetic
+
+def digit_sum(n, base = 10) :
+    '''Returns the sum of the digits of the given number in the given base.'''
+
+    _check_digits(n, base)
+
+    total = 0
+    while n :
+        n, r = divmod(n, base)
+        total += r
+
+    return total
+
+def reverse_digits(n, base = 10) :
+    '''Returns the number whose digits in the given base are those of the given
+    number, in reverse.'''
+
+    _check_digits(n, base)
+
+    reversed_n = 0
+    while n :
+        n, r = divmod(n, base)
+        reversed_n = reversed_n * base + r
+
+    return reversed_n
+
+def is_palindrome_string(n) :
     '''Determines if the given number is a palindrome.'''
 
-    d = tuple(digits(n))
+    d = tuple(digits_string(n))
     return d == d[::-1]
 
+def is_palindrome_arithmetic(n, base = 10) :
+    '''Determines if the given number is a palindrome in the given base.'''
+
+    if n < 0 or (n % base == 0 and n != 0) :
+        return False
+
+    # Reverse the lower half of the digits, and compare it with the upper.
+    half = 0
+    while n > half :
+        n, r = divmod(n, base)
+        half = half * base + r
+
+    return n == half or n == half // base
+
+is_palindrome = is_palindrome_arithmetic
+
+def palindromes(length, base = 10) :
+    '''Generates all palindromes with the given number of digits in the given
+    base, in ascending order.'''
+
+    if length < 1 :
+        return
+
+    if length == 1 :
+        yield from range(base)
+        return
+
+    # Each palindrome is determined by its upper half, which is mirrored onto
+    # the lower half, leaving out the middle digit if the length is odd.
+    upper = (length + 1) // 2
+    shift = base ** (length // 2)
+
+    for half in range(base ** (upper - 1), base ** upper) :
+        mirror = half // base if length % 2 else half
+        yield half * shift + reverse_digits(mirror, base)
+
 ## Square Testing.
 
 square_endings = {0x00, 0x01, 0x04, 0x09, 0x10, 0x11, 0x19, 0x21, 0x24, 0x29,
                    0x31, 0x39}
 
-def is_square(n) :
+# Only exact below 2**53, and fails outright above 2**1024.
+def is_square_float(n) :
     '''Determines if the given umber is a square.'''
 
     if n & 0x3f not in square_endings :
@@ -329,3 +1359,462 @@ def is_square(n) :
 
     root = int(n**0.5)
     return root*root == n
+
+def _power_residues(m, k) :
+    '''Returns a table marking the kth powers modulo m.'''
+
+    table = bytearray(m)
+    for i in range(m) :
+        table[pow(i, k, m)] = 1
+    return bytes(table)
+
+# Squares modulo 64, 63, 65 and 11. Between them, they reject all but about
+# 1% of non-squares before a root is ever taken. The last three are checked
+# through a single reduction modulo their product.
+square_residues_64 = _power_residues(64, 2)
+square_residues_63 = _power_residues(63, 2)
+square_residues_65 = _power_residues(65, 2)
+square_residues_11 = _power_residues(11, 2)
+
+# Likewise, cubes modulo 63 (which are only 0, 1 or -1 modulo 7 and 9).
+cube_residues_63 = _power_residues(63, 3)
+
+def is_square_isqrt(n) :
+    '''Determines if the given number is a square, exactly.'''
+
+    if n < 0 or not square_residues_64[n & 0x3f] :
+        return False
+
+    r = n % 45045
+    if not (square_residues_63[r % 63] and square_residues_65[r % 65] and
+            square_residues_11[r % 11]) :
+        return False
+
+    root = isqrt(n)
+    return root*root == n
+
+is_square = is_square_isqrt
+
+def integer_nth_root(n, k) :
+    '''Computes the largest integer whose kth power does not exceed n.'''
+
+    if k < 1 :
+        raise ValueError("Cannot take root of order {}.".format(k))
+
+    if n < 0 :
+        if k % 2 == 0 :
+            raise ValueError("Even root of negative number {}.".format(n))
+        root = integer_nth_root(-n, k)
+        return -root if root**k == -n else -root - 1
+
+    if k == 1 or n < 2 :
+        return n
+
+    if k == 2 :
+        return isqrt(n)
+
+    # Newton's method, from an initial guess no smaller than the root, so that
+    # the iterates decrease until they reach it.
+    x = 1 << -(-n.bit_length() // k)
+    while True :
+        y = ((k - 1) * x + n // x**(k - 1)) // k
+        if y >= x :
+            return x
+        x = y
+
+def is_perfect_power(n) :
+    '''Determines if the given number is m**k for some integers m and k > 1.'''
+
+    if n < 0 :
+        # Only odd powers can be negative.
+        n = -n
+        exponents = primes_until(max(n.bit_length(), 3))[1:]
+    else :
+        if is_square(n) :
+            return True
+        exponents = primes_until(max(n.bit_length(), 2))[1:]
+
+    if n < 2 :
+        return True
+
+    for k in exponents :
+        if k == 3 and not cube_residues_63[n % 63] :
+            continue
+
+        root = integer_nth_root(n, k)
+        if root < 2 :
+            break
+        if root**k == n :
+            return True
+
+    return False
+
+## Batch versions, operating on whole numpy arrays at once.
+
+# The largest value for which the batch functions build a sieve up to the
+# maximum of their input. Beyond this, they fall back to other methods.
+batch_sieve_limit = 2**25
+
+def _as_int_array(values) :
+    '''Converts the given values to a numpy array of 64 bit integers.'''
+
+    if numpy is None :
+        raise ImportError("Batch functions require numpy.")
+
+    return numpy.asarray(values, dtype = numpy.int64)
+
+def _numpy_prime_sieve(n) :
+    '''Returns a boolean array, marking the primes up to n.'''
+
+    sieve = numpy.ones(n + 1, dtype = bool)
+    sieve[:2] = False
+    sieve[4::2] = False
+
+    for i in range(3, isqrt(n) + 1, 2) :
+        if sieve[i] :
+            sieve[i*i::2*i] = False
+
+    return sieve
+
+def _numpy_pow_mod(a, e, n) :
+    '''Computes a**e % n elementwise, for arrays of unsigned 64 bit integers,
+    with n below 2**32.'''
+
+    result = numpy.ones_like(n)
+    base = a % n
+    e = e.copy()
+
+    while e.any() :
+        odd = (e & 1).astype(bool)
+        result = numpy.where(odd, result * base % n, result)
+        base = base * base % n
+        e >>= numpy.uint64(1)
+
+    return result
+
+def _numpy_miller_rabin(n) :
+    '''Tests every odd number above 61 and below 2**32 in the array n for
+    primality, with the witnesses 2, 7 and 61.'''
+
+    n = n.astype(numpy.uint64)
+    one = numpy.uint64(1)
+
+    # Express n - 1 in the form u * 2 ** t
+    u = n - one
+    t = numpy.zeros_like(n)
+    while True :
+        even = (u & one) == 0
+        if not even.any() :
+            break
+        u = numpy.where(even, u >> one, u)
+        t += even
+
+    prime = numpy.ones(n.shape, dtype = bool)
+
+    for a in (2, 7, 61) :
+        x = _numpy_pow_mod(numpy.full_like(n, a), u, n)
+        witness = (x != one) & (x != n - one)
+
+        for r in range(1, int(t.max()) if t.size else 0) :
+            active = witness & (r < t)
+            x = numpy.where(active, x * x % n, x)
+            witness &= ~(active & (x == n - one))
+
+        prime &= ~witness
+
+    return prime
+
+def is_prime_many(values) :
+    '''Tests every number in the given array for primality.'''
+
+    values = _as_int_array(values)
+    result = numpy.zeros(values.shape, dtype = bool)
+    if values.size == 0 :
+        return result
+
+    top = int(values.max())
+
+    if top <= batch_sieve_limit :
+        sieve = _numpy_prime_sieve(max(top, 2))
+        positive = values >= 0
+        result[positive] = sieve[values[positive]]
+        return result
+
+    # Small numbers come from a sieve, the rest from a vectorized
+    # Miller-Rabin test, and anything too big for it one at a time.
+    sieve = _numpy_prime_sieve(2**16)
+    small = (values >= 0) & (values <= 2**16)
+    result[small] = sieve[values[small]]
+
+    medium = (values > 2**16) & (values < 2**32) & (values % 2 == 1)
+    result[medium] = _numpy_miller_rabin(values[medium])
+
+    large = values >= 2**32
+    result[large] = [is_prime(int(n)) for n in values[large]]
+
+    return result
+
+def _prime_multiples(primes, n) :
+    '''Returns every multiple up to n of the given primes, along with the
+    prime it is a multiple of. The primes must all exceed the square root of n,
+    so that no multiple appears twice.'''
+
+    counts = n // primes
+    p = numpy.repeat(primes, counts)
+    starts = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    return p * (numpy.arange(len(p)) - starts + 1), p
+
+def _multiplicative_table(n, update) :
+    '''Builds a table of a multiplicative function over 0..n.
+
+    update(values, p, k) must return the values at the multiples of p**k,
+    with their factor for p**(k - 1) replaced by the one for p**k.
+    '''
+
+    table = numpy.ones(n + 1, dtype = numpy.int64)
+    primes = numpy.flatnonzero(_numpy_prime_sieve(n))
+    root = isqrt(n)
+
+    for p in primes[primes <= root].tolist() :
+        pk, k = p, 1
+        while pk <= n :
+            table[pk::pk] = update(table[pk::pk], p, k)
+            pk *= p
+            k += 1
+
+    # Larger primes only ever divide a number once, so they can all be dealt
+    # with together, instead of one slice at a time.
+    indices, p = _prime_multiples(primes[primes > root], n)
+    table[indices] = update(table[indices], p, 1)
+
+    return table
+
+def _batch_multiplicative(values, function, update) :
+    '''Evaluates a multiplicative function at every number in the given
+    array, through a table if it isn't too large, and one element at a time
+    otherwise.'''
+
+    values = _as_int_array(values)
+
+    if values.size and values.min() < 1 :
+        raise ValueError("Arithmetic functions are only defined for positive "
+                         "integers.")
+
+    top = int(values.max()) if values.size else 1
+
+    if top > batch_sieve_limit :
+        return numpy.array(
+            [function(int(n)) for n in values.ravel()], dtype = numpy.int64
+        ).reshape(values.shape)
+
+    return _multiplicative_table(top, update)[values]
+
+def phi_array(values) :
+    '''Computes the Euler Totient function of every number in the given
+    array.'''
+
+    def update(values, p, k) :
+        return values * (p - 1) if k == 1 else values * p
+
+    values = _as_int_array(values)
+    result = _batch_multiplicative(values, phi, update)
+
+    # Agree with phi, which takes phi(1) to be 0.
+    result[values == 1] = 0
+    return result
+
+def _sigma_update(k) :
+    '''Returns the update for _multiplicative_table which builds sigma(n, k).'''
+
+    def update(values, p, j) :
+        # Replace 1 + ... + p**(k*(j - 1)) by 1 + ... + p**(k*j)
+        previous = sum(p**(k*i) for i in range(j))
+        return values // previous * (previous + p**(k*j))
+
+    return update
+
+def sigma_array(values, k = 1) :
+    '''Computes the sum of the kth powers of the divisors of every number in
+    the given array. The results must fit in 64 bits.'''
+
+    return _batch_multiplicative(values, lambda n : sigma(n, k), _sigma_update(k))
+
+def tau_array(values) :
+    '''Computes the number of divisors of every number in the given array.'''
+
+    def update(values, p, j) :
+        return values // j * (j + 1)
+
+    return _batch_multiplicative(values, tau, update)
+
+if numpy is not None :
+    square_residue_mask_64 = numpy.frombuffer(square_residues_64, dtype = bool)
+
+def is_square_many(values) :
+    '''Determines which numbers in the given array are squares.'''
+
+    values = _as_int_array(values)
+    result = (values >= 0) & square_residue_mask_64[values & 0x3f]
+
+    # Unsigned, so that squaring a root just above the true one can't overflow.
+    candidates = values[result].astype(numpy.uint64)
+    root = numpy.floor(numpy.sqrt(candidates.astype(numpy.float64)))
+    root = root.astype(numpy.uint64)
+
+    # The floating point root may be off by one in either direction.
+    root -= (root * root > candidates).astype(numpy.uint64)
+    root += ((root + 1) * (root + 1) <= candidates).astype(numpy.uint64)
+
+    result[result] = root * root == candidates
+    return result
+
+def gcd_many(m, n) :
+    '''Computes the GCD (Greatest Common Divisor) of the given arrays,
+    elementwise.'''
+
+    return numpy.gcd(_as_int_array(m), _as_int_array(n))
+
+## Summatory functions.
+
+# The largest table of small values the summatory functions will sieve.
+summatory_sieve_limit = 2**24
+
+def tau_sum(n) :
+    '''Returns the sum of tau(k) for all k up to n, using the Dirichlet
+    hyperbola method in O(n**(1/2)) time.'''
+
+    if n < 1 :
+        return 0
+
+    r = isqrt(n)
+    return 2 * sum(n // d for d in range(1, r + 1)) - r * r
+
+def divisor_sum(n) :
+    '''Returns the sum of sigma(k) for all k up to n, using the Dirichlet
+    hyperbola method in O(n**(1/2)) time.'''
+
+    if n < 1 :
+        return 0
+
+    r = isqrt(n)
+    return (sum(d * (n // d) + (n // d) * (n // d + 1) // 2
+                for d in range(1, r + 1))
+            - r * r * (r + 1) // 2)
+
+def _mobius_prefix_sums(n) :
+    '''Returns the values of the Mertens function over 0..n, by sieving the
+    Mobius function.'''
+
+    if numpy is not None :
+        def update(values, p, k) :
+            return -values if k == 1 else values * 0
+
+        table = _multiplicative_table(n, update)
+        table[0] = 0
+        return numpy.cumsum(table)
+
+    table = [1] * (n + 1)
+    for p in primes_until(n) :
+        table[p::p] = [-v for v in table[p::p]]
+        table[p*p::p*p] = [0] * len(range(p*p, n + 1, p*p))
+
+    table[0] = 0
+    return array('q', accumulate(table))
+
+def _mertens_values(n) :
+    '''Computes the Mertens function at every value n // i.
+
+    Returns the values up to some bound L as a sequence, along with those
+    above it as a sequence indexed by i, for n // i > L.
+    '''
+
+    # The values up to L are sieved, and each of the n // L above it takes
+    # O((n // i)**(1/2)) work, so L around n**(2/3) balances the two.
+    limit = max(isqrt(n), min(int(n ** (2/3)), summatory_sieve_limit), 1)
+    small = _mobius_prefix_sums(limit)
+
+    # Each M(x) follows from sum(M(x // d)) over d from 1 to x being 1, and
+    # x // d = (n // i) // d = n // (i*d), so they are computed in increasing
+    # order, as i decreases.
+    count = n // (limit + 1)
+
+    if numpy is not None :
+        large = numpy.zeros(count + 1, dtype = numpy.int64)
+
+        for i in range(count, 0, -1) :
+            x = n // i
+            r = isqrt(x)
+
+            # The terms with d up to r, one at a time.
+            d = numpy.arange(2, r + 1, dtype = numpy.int64)
+            q = x // d
+            above = q > limit
+            total = large[i * d[above]].sum() + small[q[~above]].sum()
+
+            # The terms with d above r, grouped by the value of x // d.
+            q = numpy.arange(1, x // (r + 1) + 1, dtype = numpy.int64)
+            repeats = x // q - numpy.maximum(x // (q + 1), r)
+            total += (small[q] * repeats).sum()
+
+            large[i] = 1 - total
+
+        return small, large
+
+    large = [0] * (count + 1)
+
+    for i in range(count, 0, -1) :
+        x = n // i
+        total = 1
+
+        d = 2
+        while d <= x :
+            q = x // d
+            e = x // q
+            total -= (e - d + 1) * (small[q] if q <= limit else large[i * d])
+            d = e + 1
+
+        large[i] = total
+
+    return small, large
+
+def mertens(n) :
+    '''Returns the Mertens function of the given number, the sum of the Mobius
+    function over all k up to n, in O(n**(2/3)) time.'''
+
+    if n < 1 :
+        return 0
+
+    small, large = _mertens_values(n)
+    return int(small[n]) if n < len(small) else int(large[1])
+
+def totient_sum(n) :
+    '''Returns the sum of phi(k) for all k up to n, in O(n**(2/3)) time.
+
+    Agrees with phi, in taking phi(1) to be 0.
+    '''
+
+    if n < 1 :
+        return 0
+
+    # The number of coprime pairs up to n is sum(mu(d) * (n // d)**2), and
+    # grouping the d by the value of n // d only needs the Mertens function at
+    # the values n // q.
+    small, large = _mertens_values(n)
+
+    def M(x) :
+        return int(small[x]) if x < len(small) else int(large[n // x])
+
+    pairs = 0
+    previous = 0
+    d = 1
+    while d <= n :
+        q = n // d
+        e = n // q
+        current = M(e)
+        pairs += q * q * (current - previous)
+        previous = current
+        d = e + 1
+
+    # The ordered pairs count every coprime a < b twice, and (1, 1) once, and
+    # phi(1) is taken to be 0 rather than 1.
+    return (pairs + 1) // 2 - 1
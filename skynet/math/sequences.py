@@ -1,8 +1,19 @@
-from itertools import islice, count
+from array import array
+from collections import deque
+from itertools import islice, count, compress
+from multiprocessing import Pool
+from math import isqrt, log
+import mmap
+import struct
 from functools import partial
 from skynet.decorators import memoize
 from fractions import Fraction
 
+try :
+    import numpy
+except ImportError :
+    numpy = None
+
 def Fibonacci() :
     '''A Generator for the Fibonacci numbers.'''
     p, q = 0, 1
@@ -23,7 +34,7 @@ def fibonacci(n) :
     else :
         return (2 * fibonacci((n // 2) - 1) + fibonacci(n // 2)) * fibonacci(n // 2)
 
-def primes_until(n) :
+def primes_until_odd_sieve(n) :
     '''Generates all prime numbers below a given upper bound.'''
 
     if n < 2 :
@@ -48,7 +59,160 @@ def primes_until(n) :
 
     return primes
 
-def primes_between(m, n) :
+# The residues modulo 30 of the numbers coprime to 30, which are the only
+# candidates the wheel sieve has to store.
+wheel_residues = (1, 7, 11, 13, 17, 19, 23, 29)
+wheel_index = {r : i for i, r in enumerate(wheel_residues)}
+
+def primes_until_wheel(n, segment_size = 2**18) :
+    '''Generates all prime numbers below a given upper bound, as an array.
+
+    Only numbers coprime to 30 are sieved, each wheel turn of 30 numbers taking
+    8 bytes, and the sieve is run over segments of segment_size bytes.
+    '''
+
+    primes = array('I' if n < 2**32 else 'Q', (p for p in (2, 3, 5) if p <= n))
+
+    if n < 7 :
+        return primes
+
+    base_primes = primes_until_wheel(isqrt(n))[3:]
+
+    turns = n // 30 + 1
+    segment_turns = min(max(segment_size // 8, 1), turns)
+
+    # Offsets of the candidates from the start of a segment, in the order they
+    # appear in it.
+    offsets = array(primes.typecode, (30*k + r for k in range(segment_turns)
+                                               for r in wheel_residues))
+
+    for first in range(0, turns, segment_turns) :
+        sieve = bytearray(b'\x01') * (8 * min(segment_turns, turns - first))
+        length = len(sieve)
+        low, high = 30 * first, 30 * (first + segment_turns)
+
+        for p in base_primes :
+            if p * p >= high :
+                break
+
+            # The multiples p*m with m in a fixed residue class modulo 30 all
+            # fall in the same slot of every p-th turn.
+            step = 8 * p
+            smallest = max(p, -(-low // p))
+            for r in wheel_residues :
+                turn, residue = divmod(p * (smallest + (r - smallest) % 30), 30)
+                start = 8 * (turn - first) + wheel_index[residue]
+
+                if start < length :
+                    sieve[start::step] = bytes((length - start - 1) // step + 1)
+
+        if first == 0 :
+            # 1 is not a prime.
+            sieve[0] = 0
+
+        primes.extend(map(low.__add__, compress(offsets, sieve)))
+
+    while primes[-1] > n :
+        primes.pop()
+
+    return primes
+
+primes_until = primes_until_wheel
+
+# Prime tables, written once to a file and then shared between processes
+# through a read-only memory map.
+
+# The file starts with a header of the magic string, the format version, the
+# size of each prime, the bound and the number of primes. Then comes a bitmap
+# of the odd numbers up to the bound, set for the primes, and then the primes
+# themselves.
+prime_table_magic = b'SKYNETPT'
+prime_table_version = 1
+prime_table_header = struct.Struct('<8sIIQQ')
+
+def save_prime_table(path, n) :
+    '''Writes a table of the primes up to n to the given file, for use with
+    PrimeTable.'''
+
+    primes = primes_until(n)
+
+    # One byte per odd number, packed into bits by way of a binary string,
+    # with the bits of each byte in little endian order.
+    odd = bytearray(n // 2 + 1)
+    for p in primes[1:] :
+        odd[p >> 1] = 1
+
+    length = -(-len(odd) // 64) * 8
+    bits = odd[::-1].translate(bytes.maketrans(b'\x00\x01', b'01'))
+    bitmap = int(bits, 2).to_bytes(length, 'little')
+
+    with open(path, 'wb') as f :
+        f.write(prime_table_header.pack(
+            prime_table_magic, prime_table_version, primes.itemsize, n,
+            len(primes)
+        ))
+        f.write(bitmap)
+        primes.tofile(f)
+
+class PrimeTable(object) :
+    '''A read-only table of the primes up to some bound, memory-mapped from a
+    file written by save_prime_table.
+
+    Supports fast membership tests, and indexing and iteration over the
+    primes, all without copying the file into memory.
+    '''
+
+    def __init__(self, path) :
+        with open(path, 'rb') as f :
+            self.map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+
+        magic, version, itemsize, self.limit, count = (
+            prime_table_header.unpack_from(self.map)
+        )
+
+        if magic != prime_table_magic or version != prime_table_version :
+            self.map.close()
+            raise ValueError("{} is not a prime table.".format(path))
+
+        start = prime_table_header.size
+        end = start + -(-(self.limit // 2 + 1) // 64) * 8
+
+        view = memoryview(self.map)
+        self.bitmap = view[start:end]
+        self.primes = view[end:end + count * itemsize].cast(
+            'I' if itemsize == 4 else 'Q'
+        )
+
+    def __contains__(self, n) :
+        if n > self.limit :
+            return False
+
+        if n == 2 :
+            return True
+
+        if n < 2 or n % 2 == 0 :
+            return False
+
+        i = n >> 1
+        return bool(self.bitmap[i >> 3] >> (i & 7) & 1)
+
+    def __len__(self) :
+        return len(self.primes)
+
+    def __getitem__(self, index) :
+        return self.primes[index]
+
+    def __iter__(self) :
+        return iter(self.primes)
+
+    def close(self) :
+        '''Releases the memory map.'''
+
+        self.bitmap.release()
+        self.primes.release()
+        self.map.close()
+
+def primes_between_bitmap(m, n) :
     '''Generates all primes between given lower and upper bounds.'''
 
     d = n - m + 1
@@ -79,7 +243,112 @@ def primes_between(m, n) :
 
     return [m + i for i in range(d) if bitmap[i]]
 
-def prime_generator() :
+def _sieve_window(low, high, base_primes, typecode = None) :
+    '''Returns an array of the primes in [low, high), given at least all the
+    odd primes below the square root of high.
+
+    The array has the given typecode, or else the smallest one which holds
+    numbers below high.
+    '''
+
+    if typecode is None :
+        typecode = 'I' if high <= 2**32 else 'Q'
+
+    primes = array(typecode, [2] if low <= 2 < high else [])
+
+    # Only odd numbers are stored, the ith entry standing for first + 2*i.
+    first = max(low, 1) | 1
+    if first >= high :
+        return primes
+
+    length = (high - first + 1) // 2
+    sieve = bytearray(b'\x01') * length
+
+    for p in base_primes :
+        if p * p >= high :
+            break
+
+        if p * p >= first :
+            start = (p * p - first) // 2
+        else :
+            offset = -first % p
+            start = (offset + p if offset % 2 else offset) // 2
+
+        if start < length :
+            sieve[start::p] = bytes((length - start - 1) // p + 1)
+
+    if first == 1 :
+        # 1 is not a prime.
+        sieve[0] = 0
+
+    primes.extend(compress(range(first, high, 2), sieve))
+    return primes
+
+# State for the worker processes of prime_windows, so that the base primes
+# are only sent to each of them once.
+_window_base_primes = None
+
+def _init_window_worker(base_primes) :
+    global _window_base_primes
+    _window_base_primes = base_primes
+
+def _sieve_window_worker(window) :
+    low, high, typecode = window
+    return _sieve_window(low, high, _window_base_primes, typecode)
+
+def prime_windows(m, n, segment_size = 2**18, processes = None) :
+    '''Generates arrays of all the primes between given lower and upper
+    bounds, one window of the range at a time.
+
+    Each window takes segment_size bytes, or more if the range reaches far
+    enough for the square root of its upper bound to be larger. If processes
+    is given, windows are sieved that many at a time in a process pool.
+    '''
+
+    m = max(m, 0)
+    if m > n :
+        return
+
+    # Every window shares the typecode of the last, so that they can be
+    # joined even if the range crosses 2**32.
+    typecode = 'I' if n < 2**32 else 'Q'
+
+    base_primes = primes_until(isqrt(n))[1:]
+    width = 2 * max(segment_size, isqrt(n) // 2)
+    bounds = ((low, min(low + width, n + 1)) for low in range(m, n + 1, width))
+
+    if not processes :
+        for low, high in bounds :
+            yield _sieve_window(low, high, base_primes, typecode)
+        return
+
+    # Only keep a couple of windows per process in flight, so that memory
+    # stays bounded however slowly the results are consumed.
+    with Pool(processes, _init_window_worker, (base_primes,)) as pool :
+        pending = deque()
+
+        for low, high in bounds :
+            pending.append(pool.apply_async(_sieve_window_worker,
+                                            ((low, high, typecode),)))
+            if len(pending) >= 2 * processes :
+                yield pending.popleft().get()
+
+        while pending :
+            yield pending.popleft().get()
+
+def primes_between_segmented(m, n, segment_size = 2**18, processes = None) :
+    '''Generates all primes between given lower and upper bounds, as an
+    array.'''
+
+    primes = array('I' if n < 2**32 else 'Q')
+    for window in prime_windows(m, n, segment_size, processes) :
+        primes.extend(window)
+
+    return primes
+
+primes_between = primes_between_segmented
+
+def prime_generator_incremental() :
     '''A generator for the sequence of prime numbers.'''
 
     composites = {}
@@ -97,6 +366,36 @@ def prime_generator() :
                 x += p
             composites[x] = p
 
+def prime_generator_segmented(start = 0) :
+    '''A generator for the sequence of prime numbers, starting from the given
+    lower bound.
+
+    The sequence is sieved in successively larger blocks, and the primes
+    needed to sieve them are extended as they are reached.
+    '''
+
+    low = max(start, 0)
+    width = 2**12
+
+    limit = isqrt(low + width)
+    base_primes = primes_until(limit)[1:]
+
+    while True :
+        high = low + width
+
+        root = isqrt(high)
+        if root > limit :
+            extended = max(2 * limit, root)
+            base_primes.extend(_sieve_window(limit + 1, extended + 1, base_primes))
+            limit = extended
+
+        yield from _sieve_window(low, high, base_primes)
+
+        low = high
+        width = min(2 * width, max(2**21, 2 * root))
+
+prime_generator = prime_generator_segmented
+
 def primes(start = None, stop = None) :
     '''Computes all primes numbers within the given specifications.'''
     if start is None :
@@ -107,6 +406,122 @@ def primes(start = None, stop = None) :
 
     return primes_between(start, stop)
 
+def prime_pi_lucy(x) :
+    '''Counts the prime numbers up to the given bound.
+
+    Uses the Lucy_Hedgehog algorithm, counting primes at every value x // i
+    at once, in O(x**(3/4)) time and O(x**(1/2)) memory.
+    '''
+
+    if x < 2 :
+        return 0
+
+    r = isqrt(x)
+
+    # small[v] counts the survivors up to v, and large[i] those up to x // i.
+    # To begin with, that's everything above 1.
+    small = [v - 1 for v in range(r + 1)]
+    small[0] = 0
+    large = [0] + [x // i - 1 for i in range(1, r + 1)]
+
+    for p in range(2, r + 1) :
+        if small[p] == small[p - 1] :
+            continue
+
+        # Remove the survivors whose smallest prime factor is p.
+        sp = small[p - 1]
+        p2 = p * p
+        end = min(r, x // p2)
+
+        k = min(end, r // p)
+        large[1:k + 1] = [a - b + sp for a, b in
+                          zip(large[1:k + 1], large[p:k*p + 1:p])]
+
+        xp = x // p
+        large[k + 1:end + 1] = [large[i] - small[xp // i] + sp
+                                for i in range(k + 1, end + 1)]
+
+        if p2 <= r :
+            small[p2:] = [small[v] - small[v // p] + sp for v in range(p2, r + 1)]
+
+    return large[1]
+
+def prime_pi_numpy(x) :
+    '''Counts the prime numbers up to the given bound.
+
+    The same algorithm as prime_pi_lucy, with each step done on whole numpy
+    arrays. The bound must be below 2**63.
+    '''
+
+    if x < 2 :
+        return 0
+
+    r = isqrt(x)
+
+    small = numpy.arange(-1, r, dtype = numpy.int64)
+    small[0] = 0
+    large = numpy.zeros(r + 1, dtype = numpy.int64)
+    large[1:] = x // numpy.arange(1, r + 1, dtype = numpy.int64) - 1
+
+    for p in range(2, r + 1) :
+        if small[p] == small[p - 1] :
+            continue
+
+        sp = int(small[p - 1])
+        p2 = p * p
+        end = min(r, x // p2)
+
+        k = min(end, r // p)
+        large[1:k + 1] -= large[p:k*p + 1:p] - sp
+
+        xp = x // p
+        large[k + 1:end + 1] -= (
+            small[xp // numpy.arange(k + 1, end + 1, dtype = numpy.int64)] - sp
+        )
+
+        if p2 <= r :
+            small[p2:] -= small[numpy.arange(p2, r + 1) // p] - sp
+
+    return int(large[1])
+
+prime_pi = prime_pi_numpy if numpy is not None else prime_pi_lucy
+
+def nth_prime(n) :
+    '''Computes the nth prime number, counting 2 as the first.'''
+
+    if n < 1 :
+        raise ValueError("There is no prime number at index {}.".format(n))
+
+    if n < 6 :
+        return (2, 3, 5, 7, 11)[n - 1]
+
+    # Cipolla's asymptotic estimate is close enough that only a short stretch
+    # has to be sieved on either side of it.
+    ln = log(n)
+    lnln = log(ln)
+    estimate = int(n * (ln + lnln - 1 + (lnln - 2) / ln))
+
+    count = prime_pi(estimate)
+
+    if count < n :
+        for p in prime_generator(estimate + 1) :
+            count += 1
+            if count == n :
+                return p
+
+    width = 2 * isqrt(estimate) + 1
+    high = estimate
+
+    while True :
+        low = max(high - width, 0)
+        window = primes_between(low + 1, high)
+
+        if count - len(window) < n :
+            return window[n - (count - len(window)) - 1]
+
+        count -= len(window)
+        high = low
+
 def polygonal_numbers(r) :
     '''Generates a sequence of all r-gonal numbers.'''
 
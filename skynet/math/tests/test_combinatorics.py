@@ -1,4 +1,8 @@
 import unittest
+from functools import reduce
+from math import factorial
+from operator import floordiv
+from random import randint
 from skynet.math import combinatorics
 
 class EnumerationTest(unittest.TestCase) :
@@ -33,10 +37,80 @@ class EnumerationTest(unittest.TestCase) :
         for (n, r), c in self.known_combinations.items() :
             self.assertEqual(c, combinatorics.C(n, r))
 
+    def test_combinations_variants(self) :
+        for (n, r), c in self.known_combinations.items() :
+            self.assertEqual(c, combinatorics.C_product(n, r))
+            self.assertEqual(c, combinatorics.C_prime_exponents(n, r))
+
+        for n in range(0, 5000, 97) :
+            for r in (0, min(1, n), n // 7, n // 3, n // 2, n) :
+                self.assertEqual(combinatorics.C_product(n, r),
+                                 combinatorics.C_prime_exponents(n, r))
+
+    def test_combinations_wrong_values(self) :
+        for C in (combinatorics.C, combinatorics.C_product,
+                  combinatorics.C_prime_exponents) :
+            for n, r in ((5, 6), (5, -1)) :
+                with self.assertRaises(ValueError) :
+                    C(n, r)
+
+    def test_pascal_rows(self) :
+        rows = combinatorics.pascal_rows()
+        for n in range(60) :
+            self.assertEqual([combinatorics.C(n, r) for r in range(n + 1)], next(rows))
+
+        rows = combinatorics.pascal_rows(10)
+        for n in range(60) :
+            self.assertEqual([combinatorics.C(n, r) % 10 for r in range(n + 1)],
+                             next(rows))
+
     def test_permutations(self) :
         for (n, r), c in self.known_permutations.items() :
             self.assertEqual(c, combinatorics.P(n, r))
 
+class ModularBinomialTest(unittest.TestCase) :
+    moduli = [1, 2, 7, 8, 12, 27, 97, 100, 2**5 * 3**3 * 7, 10**9 + 7]
+
+    def test_binomial_mod(self) :
+        for m in self.moduli :
+            for n in range(60) :
+                for r in range(n + 1) :
+                    self.assertEqual(combinatorics.C(n, r) % m,
+                                     combinatorics.binomial_mod(n, r, m))
+
+    def test_binomial_mod_large_values(self) :
+        for m in self.moduli :
+            for i in range(20) :
+                n = randint(0, 3000)
+                r = randint(0, n)
+                self.assertEqual(combinatorics.C(n, r) % m,
+                                 combinatorics.binomial_mod(n, r, m))
+
+        # By Lucas' theorem.
+        self.assertEqual(combinatorics.C(5, 2) * combinatorics.C(3, 1) % 7,
+                         combinatorics.binomial_mod(5 * 7**20 + 3, 2 * 7**20 + 1, 7))
+
+    def test_binomial_mod_wrong_values(self) :
+        for n, r, m in ((5, 6, 7), (5, -1, 7), (5, 2, 0)) :
+            with self.assertRaises(ValueError) :
+                combinatorics.binomial_mod(n, r, m)
+
+    def test_multinomial(self) :
+        self.assertEqual(1, combinatorics.multinomial([]))
+        self.assertEqual(1, combinatorics.multinomial([0, 0]))
+        self.assertEqual(34650, combinatorics.multinomial([1, 4, 4, 2]))
+        self.assertEqual(34650 % 97, combinatorics.multinomial([1, 4, 4, 2], 97))
+        self.assertEqual(34650 % 100, combinatorics.multinomial([1, 4, 4, 2], 100))
+
+        for i in range(20) :
+            counts = [randint(0, 30) for j in range(randint(1, 5))]
+            expected = reduce(floordiv, map(factorial, counts), factorial(sum(counts)))
+            self.assertEqual(expected, combinatorics.multinomial(counts))
+            self.assertEqual(expected % 360, combinatorics.multinomial(counts, 360))
+
+        with self.assertRaises(ValueError) :
+            combinatorics.multinomial([2, -1])
+
 class NextPermutationTest(unittest.TestCase) :
     known_values = {
         (9, 1, 0) : (1, 0, 9),
@@ -73,5 +147,36 @@ class PartitionsTest(unittest.TestCase) :
         for i, p in self.known_values.items() :
             self.assertEqual(p, combinatorics.number_of_partitions(i))
 
+    def test_number_of_partitions_large_values(self) :
+        combinatorics.number_of_partitions.cache_clear()
+        self.assertEqual(combinatorics.partitions_until(5000)[5000],
+                         combinatorics.number_of_partitions(5000))
+
+    def test_partitions_until(self) :
+        partitions = combinatorics.partitions_until(200)
+        self.assertEqual(201, len(partitions))
+
+        for i, p in self.known_values.items() :
+            self.assertEqual(p, partitions[i])
+
+        for m in (1, 2, 7, 10**9 + 7) :
+            self.assertEqual([p % m for p in partitions],
+                             combinatorics.partitions_until(200, m))
+
+        self.assertEqual([1], combinatorics.partitions_until(0))
+
+        with self.assertRaises(ValueError) :
+            combinatorics.partitions_until(10, 0)
+
+    def test_partitions_rademacher(self) :
+        for i, p in self.known_values.items() :
+            self.assertEqual(p, combinatorics.partitions_rademacher(i))
+
+        partitions = combinatorics.partitions_until(2000)
+        for i in range(0, 2001, 37) :
+            self.assertEqual(partitions[i], combinatorics.partitions_rademacher(i))
+
+        self.assertEqual(0, combinatorics.partitions_rademacher(-1))
+
 if __name__ == '__main__' :
     unittest.main()
@@ -1,5 +1,7 @@
+import os
+import tempfile
 import unittest
-from skynet.math import numbers
+from skynet.math import numbers, sequences
 from random import randint
 from operator import mul
 from functools import reduce
@@ -35,6 +37,43 @@ class FactorialTest(unittest.TestCase) :
             with self.assertRaises(ValueError) :
                 numbers.iterative_factorial(n)
 
+    def test_factorial_valuation(self) :
+        for n in range(100) :
+            for p in (2, 3, 5, 7) :
+                f, v = numbers.factorial(n), 0
+                while f % p**(v + 1) == 0 :
+                    v += 1
+                self.assertEqual(v, numbers.factorial_valuation(n, p))
+
+    def test_factorial_mod(self) :
+        for m in list(range(1, 40)) + [97, 1000, 10007] :
+            for n in range(0, 200, 3) :
+                self.assertEqual(numbers.factorial(n) % m, numbers.factorial_mod(n, m))
+
+        # Reflected through Wilson's theorem.
+        p = 10**9 + 7
+        self.assertEqual(p - 1, numbers.factorial_mod(p - 1, p))
+        self.assertEqual(1, numbers.factorial_mod(p - 2, p))
+        self.assertEqual(p - numbers.modular_inverse(2, p), numbers.factorial_mod(p - 3, p))
+
+    def test_factorial_mod_wrong_values(self) :
+        for n, m in ((-1, 7), (5, 0)) :
+            with self.assertRaises(ValueError) :
+                numbers.factorial_mod(n, m)
+
+    def test_factorial_table(self) :
+        p = 1009
+        factorials, inverses = numbers.factorial_table(p, 100)
+        self.assertTrue(len(factorials) > 100)
+
+        for k in range(len(factorials)) :
+            self.assertEqual(numbers.factorial(k) % p, factorials[k])
+            self.assertEqual(1, factorials[k] * inverses[k] % p)
+
+        factorials, inverses = numbers.factorial_table(p, p - 1)
+        self.assertEqual(p, len(factorials))
+        self.assertEqual(p, len(inverses))
+
 class GCDTest(unittest.TestCase) :
     known_values = {
         (2, 3) : 1,
@@ -73,6 +112,49 @@ class GCDTest(unittest.TestCase) :
         for chain, g in self.known_chains.items() :
             self.assertEqual(g, numbers.chained_gcd(*chain))
 
+    def test_binary_gcd(self) :
+        for (m, n), g in self.known_values.items() :
+            self.assertEqual(g, numbers.binary_gcd(m, n))
+            self.assertEqual(g, numbers.binary_gcd(n, m))
+
+    def test_lehmer_gcd(self) :
+        for (m, n), g in self.known_values.items() :
+            self.assertEqual(g, numbers.lehmer_gcd(m, n))
+            self.assertEqual(g, numbers.lehmer_gcd(n, m))
+
+    def test_large_gcd(self) :
+        for i in range(20) :
+            g = randint(1, 10**100)
+            m, n = g * randint(1, 10**1000), g * randint(1, 10**1000)
+            self.assertEqual(numbers.iterative_gcd(m, n), numbers.lehmer_gcd(m, n))
+            self.assertEqual(numbers.iterative_gcd(m, n), numbers.binary_gcd(m, n))
+
+class BatchGCDTest(unittest.TestCase) :
+    known_values = {
+        () : [],
+        (5,) : [1],
+        (6, 10, 15, 7) : [6, 10, 15, 1],
+        (3, 3) : [3, 3],
+        (35, 77, 143, 221) : [7, 77, 143, 13],
+    }
+
+    def test_batch_gcd_known_values(self) :
+        for values, gcds in self.known_values.items() :
+            self.assertEqual(gcds, numbers.batch_gcd(values))
+
+    def test_batch_gcd_random_values(self) :
+        for i in range(20) :
+            values = [randint(1, 10**randint(1, 30)) for j in range(randint(2, 40))]
+            self.assertEqual(
+                [numbers.gcd(x, reduce(mul, values[:j] + values[j + 1:], 1))
+                 for j, x in enumerate(values)],
+                numbers.batch_gcd(values)
+            )
+
+    def test_batch_gcd_wrong_values(self) :
+        with self.assertRaises(ValueError) :
+            numbers.batch_gcd([3, 0, 5])
+
 class LCMTest(unittest.TestCase) :
     known_values = {
         (2, 3) : 6,
@@ -95,6 +177,31 @@ class LCMTest(unittest.TestCase) :
         for chain, lcm in self.known_values.items() :
             self.assertEqual(lcm, numbers.chained_lcm(*chain))
 
+    def test_lcm_range(self) :
+        self.assertEqual(1, numbers.lcm_range(0))
+        self.assertEqual(1, numbers.lcm_range(1))
+        self.assertEqual(2520, numbers.lcm_range(10))
+        self.assertEqual(232792560, numbers.lcm_range(20))
+
+        for n in range(2, 200) :
+            self.assertEqual(numbers.chained_lcm(*range(1, n + 1)),
+                             numbers.lcm_range(n))
+
+        with self.assertRaises(ValueError) :
+            numbers.lcm_range(-1)
+
+class ProductTreeTest(unittest.TestCase) :
+    def test_product_tree(self) :
+        self.assertEqual(1, numbers.product_tree([]))
+        self.assertEqual(7, numbers.product_tree([7]))
+        self.assertEqual(0, numbers.product_tree([3, 0, 5]))
+
+        for n in (2, 15, 16, 17, 33, 100, 1000) :
+            values = [randint(-10**20, 10**20) for i in range(n)]
+            self.assertEqual(reduce(mul, values, 1), numbers.product_tree(values))
+            self.assertEqual(reduce(mul, values, 1),
+                             numbers.product_tree(iter(values)))
+
 class XGCDTest(unittest.TestCase) :
     known_values = {
         (2, 3) : 1,
@@ -122,12 +229,64 @@ class XGCDTest(unittest.TestCase) :
             self.assertEqual(g, h)
             self.assertEqual(x*m + y*n, h)
 
+class ModContextTest(unittest.TestCase) :
+    moduli = [1, 2, 12, 97, 2**61 - 1, 10**20 + 1]
+
+    def test_mod_context_arithmetic(self) :
+        for n in self.moduli :
+            context = numbers.ModContext(n)
+            for i in range(20) :
+                a, b = randint(-10**25, 10**25), randint(-10**25, 10**25)
+                e = randint(0, 1000)
+                self.assertEqual(a % n, context.reduce(a))
+                self.assertEqual(a * b % n, context.mul(a, b))
+                self.assertEqual(a * a % n, context.square(a))
+                self.assertEqual(pow(a, e, n), context.pow(a, e))
+
+    def test_mod_context_pow_many(self) :
+        context = numbers.ModContext(97)
+        bases = list(range(1, 97))
+
+        self.assertEqual([pow(a, 5, 97) for a in bases],
+                         context.pow_many(bases, 5))
+        self.assertEqual([pow(a, -5, 97) for a in bases],
+                         context.pow_many(bases, -5))
+        self.assertEqual(pow(3, -2, 97), context.pow(3, -2))
+
+        with self.assertRaises(ValueError) :
+            numbers.ModContext(12).pow(4, -1)
+
+    def test_mod_context_wrong_values(self) :
+        for n in (0, -5) :
+            with self.assertRaises(ValueError) :
+                numbers.ModContext(n)
+
+    def test_mod_context_is_witness(self) :
+        for n in range(3, 2000, 2) :
+            context = numbers.ModContext(n)
+            witnesses = [a for a in range(2, min(n - 1, 50))
+                         if context.is_witness(a)]
+            if numbers.is_prime_6k1(n) :
+                self.assertEqual([], witnesses)
+            elif n > 51 :
+                self.assertNotEqual([], witnesses)
+
 class PrimalityTest(unittest.TestCase) :
     known_values = [2, 3, 127, 953, 881, 743, 409, 311, 317, 43]
     wrong_values = [1, 703, 608, 705, 764, 837, 949, 210, 336, 81]
 
     pseudoprimes = [561, 1105, 1729]
 
+    large_primes = [2**31 - 1, 2**61 - 1, 2**89 - 1, 2**127 - 1, 10**9 + 7]
+
+    # Strong pseudoprimes to the bases of the deterministic witness sets.
+    strong_pseudoprimes = [2047, 3277, 4033, 1373653, 25326001, 3215031751,
+                           2152302898747, 3474749660383, 341550071728321,
+                           3825123056546413051, 318665857834031151167461,
+                           3317044064679887385961981, (2**61 - 1)*(2**89 - 1)]
+
+    strong_lucas_pseudoprimes = [5459, 5777, 10877, 16109, 18971]
+
     def test_is_prime_vanilla_known_values(self) :
         for p in self.known_values :
             self.assertTrue(numbers.is_prime_vanilla(p))
@@ -172,6 +331,26 @@ class PrimalityTest(unittest.TestCase) :
         for q in self.wrong_values :
             self.assertFalse(numbers.is_prime_miller_rabin(q))
 
+    def test_is_prime_miller_rabin_deterministic_known_values(self) :
+        for p in self.known_values + self.large_primes :
+            self.assertTrue(numbers.is_prime_miller_rabin_deterministic(p))
+
+    def test_is_prime_miller_rabin_deterministic_wrong_values(self) :
+        for q in self.wrong_values + self.strong_pseudoprimes :
+            self.assertFalse(numbers.is_prime_miller_rabin_deterministic(q))
+
+    def test_is_prime_baillie_psw_known_values(self) :
+        for p in self.known_values + self.large_primes :
+            self.assertTrue(numbers.is_prime_baillie_psw(p))
+
+    def test_is_prime_baillie_psw_wrong_values(self) :
+        for q in self.wrong_values + self.strong_pseudoprimes :
+            self.assertFalse(numbers.is_prime_baillie_psw(q))
+
+    def test_is_strong_lucas_probable_prime_pseudoprimes(self) :
+        for q in self.strong_lucas_pseudoprimes :
+            self.assertTrue(numbers.is_strong_lucas_probable_prime(q))
+
     def test_is_prime(self) :
         for p in self.known_values :
             self.assertTrue(numbers.is_prime(p))
@@ -204,6 +383,52 @@ class DigitsTest(unittest.TestCase) :
                 )
             )
 
+    bases = [2, 3, 7, 16]
+
+    def test_digits_string_known_values(self) :
+        for n in self.known_values :
+            self.assertEqual(tuple(int(i) for i in str(n)),
+                             numbers.digits_string(n))
+
+    def test_digits_arithmetic_bases(self) :
+        for n in self.known_values :
+            for base in self.bases :
+                d = numbers.digits_arithmetic(n, base)
+                self.assertTrue(all(0 <= i < base for i in d))
+                self.assertEqual(
+                    n, sum(i*base**index for index, i in enumerate(reversed(d)))
+                )
+
+    def test_digit_sum(self) :
+        for n in self.known_values :
+            for base in self.bases + [10] :
+                self.assertEqual(sum(numbers.digits(n, base)),
+                                 numbers.digit_sum(n, base))
+
+    def test_reverse_digits(self) :
+        for n in self.known_values :
+            self.assertEqual(int(str(n)[::-1]), numbers.reverse_digits(n))
+            for base in self.bases :
+                # Trailing zeros become leading ones, and disappear.
+                d = numbers.digits(n, base)
+                while len(d) > 1 and d[-1] == 0 :
+                    d = d[:-1]
+                self.assertEqual(
+                    d[::-1],
+                    numbers.digits(numbers.reverse_digits(n, base), base)
+                )
+
+    def test_digits_wrong_values(self) :
+        functions = [numbers.digits_string, numbers.digits_arithmetic,
+                     numbers.digit_sum, numbers.reverse_digits]
+
+        for function in functions :
+            self.assertRaises(ValueError, function, -5)
+
+        for function in functions[1:] :
+            for base in (1, 0, -2) :
+                self.assertRaises(ValueError, function, 5, base)
+
 class PalindromeTest(unittest.TestCase) :
     known_values = [
         1,
@@ -239,6 +464,53 @@ class PalindromeTest(unittest.TestCase) :
         for n in self.wrong_values :
             self.assertFalse(numbers.is_palindrome(n))
 
+    def test_palindrome_string(self) :
+        for p in self.known_values :
+            self.assertTrue(numbers.is_palindrome_string(p))
+        for n in self.wrong_values :
+            self.assertFalse(numbers.is_palindrome_string(n))
+
+    def test_palindrome_arithmetic_bases(self) :
+        for n in range(2000) :
+            for base in (2, 3, 10, 16) :
+                d = numbers.digits(n, base)
+                self.assertEqual(d == d[::-1],
+                                 numbers.is_palindrome_arithmetic(n, base))
+
+    def test_palindromes(self) :
+        for length in range(1, 6) :
+            for base in (2, 10) :
+                lower = base**(length - 1) if length > 1 else 0
+                self.assertEqual(
+                    [n for n in range(lower, base**length)
+                       if numbers.is_palindrome(n, base)],
+                    list(numbers.palindromes(length, base))
+                )
+
+class PrimeTableTest(unittest.TestCase) :
+    bound = 10000
+
+    def setUp(self) :
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+        sequences.save_prime_table(self.path, self.bound)
+        self.table = numbers.load_prime_table(self.path)
+
+    def tearDown(self) :
+        numbers.prime_table = None
+        self.table.close()
+        os.remove(self.path)
+
+    def test_load_prime_table(self) :
+        self.assertIs(self.table, numbers.prime_table)
+
+        for n in range(self.bound + 100) :
+            expected = numbers.is_prime_6k1(n)
+            self.assertEqual(expected, numbers.is_prime(n))
+            self.assertEqual(expected, numbers.is_prime_miller_rabin(n))
+            self.assertEqual(expected, numbers.is_prime_miller_rabin_deterministic(n))
+
 class FactorizationTest(unittest.TestCase) :
     known_values = [1, 2] + [randint(3, 2**5) for i in range(18)]
 
@@ -250,6 +522,76 @@ class FactorizationTest(unittest.TestCase) :
                              numbers.prime_factors_trial_division(n)), 1)
             )
 
+class HybridFactorizationTest(unittest.TestCase) :
+    known_values = {
+        1 : [(1, 1)],
+        2 : [(2, 1)],
+        12 : [(2, 2), (3, 1)],
+        131073 : [(3, 1), (43691, 1)],
+        600851475143 : [(71, 1), (839, 1), (1471, 1), (6857, 1)],
+        2**61 - 1 : [(2**61 - 1, 1)],
+        3**40 : [(3, 40)],
+        (2**31 - 1) * (2**29 - 3) : [(2**29 - 3, 1), (2**31 - 1, 1)],
+        (10**9 + 7)**2 * (10**9 + 9) : [(10**9 + 7, 2), (10**9 + 9, 1)],
+        (2**61 - 1)**3 : [(2**61 - 1, 3)],
+        (2**45 - 55)**5 : [(2**45 - 55, 5)],
+    }
+
+    random_values = [randint(1, 2**64) for i in range(20)]
+
+    def test_prime_factors_hybrid_known_values(self) :
+        for n, f in self.known_values.items() :
+            self.assertEqual(f, list(numbers.prime_factors_hybrid(n)))
+
+    def test_prime_factors_hybrid_random_values(self) :
+        for n in self.random_values :
+            f = list(numbers.prime_factors_hybrid(n))
+            self.assertEqual(n, reduce(mul, (p**e for p, e in f), 1))
+            self.assertTrue(all(numbers.is_prime(p) for p, e in f))
+            self.assertEqual(sorted(f), f)
+
+    def test_prime_factors_hybrid_wrong_values(self) :
+        for n in [0, -1, -12] :
+            with self.assertRaises(ValueError) :
+                list(numbers.prime_factors_hybrid(n))
+
+    def test_pollard_brent(self) :
+        n = (10**9 + 7) * (10**9 + 9)
+        self.assertIn(numbers.pollard_brent(n), (10**9 + 7, 10**9 + 9))
+
+    def test_ecm(self) :
+        p, q = 1000000000039, 100000000000000000039
+        self.assertEqual(p, numbers.ecm(p * q, 2000, curves = 50))
+
+class SPFTableTest(unittest.TestCase) :
+    bound = 10000
+
+    def setUp(self) :
+        self.table = numbers.build_spf_table(self.bound)
+
+    def tearDown(self) :
+        numbers.spf_table = None
+
+    def test_build_spf_table(self) :
+        for n in range(2, self.bound + 1) :
+            p = int(self.table[n]) or n
+            self.assertEqual(next(numbers.prime_factors_trial_division(n))[0], p)
+
+    def test_prime_factors_spf(self) :
+        for n in range(1, self.bound + 1) :
+            self.assertEqual(
+                list(numbers.prime_factors_hybrid(n)),
+                list(numbers.prime_factors_spf(n))
+            )
+
+    def test_prime_factors_uses_table(self) :
+        numbers.spf_table = None
+        expected = [numbers.phi(n) for n in range(1, 1000)]
+
+        numbers.build_spf_table(self.bound)
+        self.assertEqual(expected, [numbers.phi(n) for n in range(1, 1000)])
+        self.assertEqual([(2**61 - 1, 1)], list(numbers.prime_factors(2**61 - 1)))
+
 class DivisorsTest(unittest.TestCase) :
     known_values = {
         1 : [1],
@@ -272,6 +614,36 @@ class DivisorsTest(unittest.TestCase) :
         for n, d in self.known_values.items() :
             self.assertEqual(d, sorted(list(numbers.divisors_cartesian_product(n))))
 
+class SortedDivisorsTest(unittest.TestCase) :
+    bound = 2000
+
+    def test_divisors_sorted(self) :
+        for n, d in DivisorsTest.known_values.items() :
+            self.assertEqual(d, list(numbers.divisors_sorted(n)))
+
+        for n in range(1, self.bound) :
+            self.assertEqual(sorted(numbers.divisors(n)),
+                             list(numbers.divisors_sorted(n)))
+
+    def test_divisors_sorted_limit(self) :
+        for n, d in DivisorsTest.known_values.items() :
+            for limit in (0, 1, 2, 10, n // 3, n) :
+                self.assertEqual([i for i in d if i <= limit],
+                                 list(numbers.divisors_sorted(n, limit)))
+
+    def test_divisors_sieve(self) :
+        lists = numbers.divisors_sieve(self.bound)
+        self.assertEqual([], lists[0])
+        for n in range(1, self.bound + 1) :
+            self.assertEqual(sorted(numbers.divisors(n)), lists[n])
+
+    def test_sigma_sieve(self) :
+        for k in range(3) :
+            sums = numbers.sigma_sieve(self.bound, k)
+            self.assertEqual(0, sums[0])
+            for n in range(1, self.bound + 1) :
+                self.assertEqual(numbers.sigma(n, k), sums[n])
+
 class PhiTest(unittest.TestCase) :
     known_values = {
         1 : 0,
@@ -343,10 +715,64 @@ class IsSquareTest(unittest.TestCase) :
         for i in self.known_values :
             self.assertTrue(numbers.is_square(i))
 
+    big_roots = [10**199 + 7, 2**1100 + 1, 3**700]
+
     def test_is_square_wrong_values(self) :
         for i in self.wrong_values :
             self.assertFalse(numbers.is_square(i))
 
+    def test_is_square_float(self) :
+        for i in self.known_values :
+            self.assertTrue(numbers.is_square_float(i))
+        for i in self.wrong_values :
+            self.assertFalse(numbers.is_square_float(i))
+
+    def test_is_square_isqrt(self) :
+        for n in range(-10, 10000) :
+            self.assertEqual(n >= 0 and numbers.isqrt(n)**2 == n,
+                             numbers.is_square_isqrt(n))
+
+    def test_is_square_isqrt_big_values(self) :
+        for r in self.big_roots :
+            self.assertTrue(numbers.is_square_isqrt(r * r))
+            self.assertFalse(numbers.is_square_isqrt(r * r + 1))
+            self.assertFalse(numbers.is_square_isqrt(r * r - 1))
+
+class PerfectPowerTest(unittest.TestCase) :
+    known_values = [0, 1, -1, 4, 8, -8, 27, -27, 32, 100, 243, 1024, 3**301,
+                    -(7**101), (10**50 + 1)**7, 2**127]
+
+    wrong_values = [2, 3, 6, -4, -16, 12, 99, 3**301 + 1, 2**127 - 1,
+                    (10**50 + 1)**7 - 1]
+
+    def test_integer_nth_root(self) :
+        for n in range(-500, 5000) :
+            for k in range(1, 8) :
+                if n < 0 and k % 2 == 0 :
+                    continue
+                r = numbers.integer_nth_root(n, k)
+                self.assertTrue(r**k <= n < (r + 1)**k)
+
+    def test_integer_nth_root_big_values(self) :
+        for r in IsSquareTest.big_roots :
+            for k in (2, 3, 7, 30) :
+                self.assertEqual(r, numbers.integer_nth_root(r**k, k))
+                self.assertEqual(r, numbers.integer_nth_root(r**k + 1, k))
+                self.assertEqual(r - 1, numbers.integer_nth_root(r**k - 1, k))
+
+    def test_integer_nth_root_wrong_values(self) :
+        for n, k in [(4, 0), (-4, 2), (16, -1)] :
+            with self.assertRaises(ValueError) :
+                numbers.integer_nth_root(n, k)
+
+    def test_is_perfect_power_known_values(self) :
+        for n in self.known_values :
+            self.assertTrue(numbers.is_perfect_power(n))
+
+    def test_is_perfect_power_wrong_values(self) :
+        for n in self.wrong_values :
+            self.assertFalse(numbers.is_perfect_power(n))
+
 class ModularInverseTest(unittest.TestCase) :
     known_values = {
         (1, 7) : 1,
@@ -390,5 +816,198 @@ class ModularInverseTest(unittest.TestCase) :
             with self.assertRaises(ValueError) :
                 numbers.modular_inverse(a, m)
 
+    def test_batch_modular_inverse(self) :
+        for m in (7, 26, 91, 10**9 + 7) :
+            values = [a for a in range(1, 200) if numbers.gcd(a, m) == 1]
+            self.assertEqual(
+                [numbers.modular_inverse(a, m) for a in values],
+                numbers.batch_modular_inverse(values, m)
+            )
+
+        self.assertEqual([], numbers.batch_modular_inverse([], 7))
+
+    def test_batch_modular_inverse_error_values(self) :
+        for (a, m) in self.error_values :
+            with self.assertRaises(ValueError) :
+                numbers.batch_modular_inverse([1, a, 1], m)
+
+class CRTTest(unittest.TestCase) :
+    known_values = {
+        ((2, 3, 2), (3, 5, 7)) : (23, 105),
+        ((1, 2, 3, 4), (5, 7, 9, 11)) : (1731, 3465),
+        ((3,), (7,)) : (3, 7),
+        ((), ()) : (0, 1),
+        ((10,), (7,)) : (3, 7),
+        ((2, 4), (6, 8)) : (20, 24),
+        ((5, 11, 1), (6, 15, 4)) : (41, 60),
+    }
+
+    error_values = [
+        ((1, 2), (4, 6)),
+        ((0, 1), (2, 4)),
+        ((3, 4, 5), (6, 9, 10)),
+    ]
+
+    def test_crt_known_values(self) :
+        for (residues, moduli), solution in self.known_values.items() :
+            self.assertEqual(solution, numbers.crt(residues, moduli))
+
+    def test_crt_random_values(self) :
+        for i in range(100) :
+            moduli = [randint(1, 1000) for j in range(randint(1, 5))]
+            x = randint(0, 10**12)
+            y, m = numbers.crt([x % n for n in moduli], moduli)
+            self.assertEqual(numbers.lcm(1, *moduli), m)
+            self.assertEqual(x % m, y)
+
+    def test_crt_error_values(self) :
+        for residues, moduli in self.error_values :
+            with self.assertRaises(ValueError) :
+                numbers.crt(residues, moduli)
+
+        with self.assertRaises(ValueError) :
+            numbers.crt((1, 2), (3,))
+
+class SummatoryTest(unittest.TestCase) :
+    bound = 1000
+
+    known_mertens = {
+        10**6 : 212,
+        10**7 : 1037,
+        10**8 : 1928,
+    }
+
+    known_totient_sums = {
+        10**6 : 303963552391,
+        10**7 : 30396356427241,
+    }
+
+    def mobius(self, n) :
+        result = 1
+        for p, e in numbers.prime_factors(n) :
+            if n == 1 :
+                break
+            if e > 1 :
+                return 0
+            result = -result
+        return result
+
+    def test_mertens(self) :
+        self.assertEqual(0, numbers.mertens(0))
+        total = 0
+        for n in range(1, self.bound) :
+            total += self.mobius(n)
+            self.assertEqual(total, numbers.mertens(n))
+
+    def test_mertens_known_values(self) :
+        for n, m in self.known_mertens.items() :
+            self.assertEqual(m, numbers.mertens(n))
+
+    def test_totient_sum(self) :
+        total = 0
+        for n in range(1, self.bound) :
+            total += numbers.phi(n)
+            self.assertEqual(total, numbers.totient_sum(n))
+
+    def test_totient_sum_known_values(self) :
+        for n, s in self.known_totient_sums.items() :
+            self.assertEqual(s, numbers.totient_sum(n))
+
+    def test_small_sieve_limit(self) :
+        limit = numbers.summatory_sieve_limit
+        numbers.summatory_sieve_limit = 10
+
+        try :
+            for n, m in self.known_mertens.items() :
+                if n <= 10**6 :
+                    self.assertEqual(m, numbers.mertens(n))
+            self.assertEqual(self.known_totient_sums[10**6],
+                             numbers.totient_sum(10**6))
+        finally :
+            numbers.summatory_sieve_limit = limit
+
+    def test_divisor_sum(self) :
+        total = 0
+        for n in range(1, self.bound) :
+            total += numbers.sigma(n)
+            self.assertEqual(total, numbers.divisor_sum(n))
+
+    def test_tau_sum(self) :
+        total = 0
+        for n in range(1, self.bound) :
+            total += numbers.tau(n)
+            self.assertEqual(total, numbers.tau_sum(n))
+
+@unittest.skipIf(numbers.numpy is None, "numpy is not available")
+class BatchTest(unittest.TestCase) :
+    bound = 5000
+
+    large_values = [2**31 - 1, 2**32 - 5, 4759123139, 2**61 - 1, 10**12 + 39,
+                    10**12 + 41, 3215031751, 25326001]
+
+    def test_is_prime_many(self) :
+        values = list(range(-5, self.bound))
+        self.assertEqual(
+            [numbers.is_prime(n) for n in values],
+            numbers.is_prime_many(values).tolist()
+        )
+
+    def test_is_prime_many_large_values(self) :
+        values = self.large_values + [randint(2**16, 2**40) for i in range(200)]
+        self.assertEqual(
+            [numbers.is_prime(n) for n in values],
+            numbers.is_prime_many(values).tolist()
+        )
+
+    def test_phi_array(self) :
+        values = list(range(1, self.bound))
+        self.assertEqual(
+            [numbers.phi(n) for n in values],
+            numbers.phi_array(values).tolist()
+        )
+
+    def test_sigma_array(self) :
+        values = list(range(1, self.bound))
+        for k in range(1, 4) :
+            self.assertEqual(
+                [numbers.sigma(n, k) for n in values],
+                numbers.sigma_array(values, k).tolist()
+            )
+
+    def test_tau_array(self) :
+        values = list(range(1, self.bound))
+        self.assertEqual(
+            [numbers.tau(n) for n in values],
+            numbers.tau_array(values).tolist()
+        )
+
+    def test_batch_fallback(self) :
+        values = [10**12 + 39, 2**40, 2**61 - 1]
+        self.assertEqual([numbers.phi(n) for n in values],
+                         numbers.phi_array(values).tolist())
+        self.assertEqual([numbers.tau(n) for n in values],
+                         numbers.tau_array(values).tolist())
+
+    def test_batch_wrong_values(self) :
+        for function in (numbers.phi_array, numbers.sigma_array,
+                         numbers.tau_array) :
+            with self.assertRaises(ValueError) :
+                function([1, 2, 0])
+
+    def test_is_square_many(self) :
+        values = (IsSquareTest.known_values + IsSquareTest.wrong_values +
+                  [-4, -1, 3037000499**2, 3037000499**2 - 1, (2**31 - 1)**2])
+        self.assertEqual(
+            [n >= 0 and numbers.isqrt(n)**2 == n for n in values],
+            numbers.is_square_many(values).tolist()
+        )
+
+    def test_gcd_many(self) :
+        pairs = list(GCDTest.known_values)
+        self.assertEqual(
+            [GCDTest.known_values[pair] for pair in pairs],
+            numbers.gcd_many([m for m, n in pairs], [n for m, n in pairs]).tolist()
+        )
+
 if __name__ == '__main__' :
     unittest.main()
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 from skynet.math import sequences
 from skynet.math.numbers import is_prime
@@ -55,9 +57,66 @@ class PrimeTest(unittest.TestCase) :
             ref = [i for i in range(lower, upper) if is_prime(i)]
             self.assertEqual(ref, list(sequences.primes_between(lower, upper)))
 
+    def test_primes_between_bitmap(self) :
+        for lower, upper in self.ranges :
+            ref = [i for i in range(lower, upper) if is_prime(i)]
+            self.assertEqual(ref, sequences.primes_between_bitmap(lower, upper))
+
+    def test_primes_between_segmented(self) :
+        for segment_size in (1, 8, 1000) :
+            self.assertEqual(
+                self.ref,
+                list(sequences.primes_between_segmented(0, self.bound, segment_size))
+            )
+
+        lower = 10**12
+        self.assertEqual(
+            [i for i in range(lower, lower + 1000) if is_prime(i)],
+            list(sequences.primes_between_segmented(lower, lower + 1000))
+        )
+
+    def test_primes_between_segmented_across_2_32(self) :
+        # The windows below 2**32 must join those above it.
+        lower, upper = 2**32 - 10**5, 2**32 + 1000
+        ref = [i for i in range(lower, upper + 1) if is_prime(i)]
+
+        for processes in (None, 2) :
+            self.assertEqual(
+                ref,
+                list(sequences.primes_between_segmented(lower, upper, 1, processes))
+            )
+
+    def test_prime_windows(self) :
+        windows = list(sequences.prime_windows(0, self.bound, 1000))
+        self.assertTrue(len(windows) > 1)
+        self.assertEqual(self.ref, [p for window in windows for p in window])
+
+    def test_prime_windows_processes(self) :
+        self.assertEqual(
+            self.ref,
+            [p for window in sequences.prime_windows(0, self.bound, 1000, 2)
+               for p in window]
+        )
+
     def test_primes_until(self) :
         self.assertEqual(self.ref, list(sequences.primes_until(self.bound)))
 
+    def test_primes_until_odd_sieve(self) :
+        self.assertEqual(self.ref, sequences.primes_until_odd_sieve(self.bound))
+
+    def test_primes_until_wheel(self) :
+        for n in range(200) :
+            self.assertEqual(
+                [i for i in self.ref if i <= n],
+                list(sequences.primes_until_wheel(n))
+            )
+
+        for segment_size in (8, 64, 1000) :
+            self.assertEqual(
+                self.ref,
+                list(sequences.primes_until_wheel(self.bound, segment_size))
+            )
+
     def test_prime_generator(self) :
         g = sequences.prime_generator()
         self.assertEqual(
@@ -65,6 +124,115 @@ class PrimeTest(unittest.TestCase) :
             list(takewhile(lambda n: n < self.bound, sequences.prime_generator()))
         )
 
+    def test_prime_generator_incremental(self) :
+        self.assertEqual(
+            self.ref,
+            list(takewhile(lambda n: n < self.bound,
+                           sequences.prime_generator_incremental()))
+        )
+
+    def test_prime_generator_segmented(self) :
+        for start in (0, 1, 2, 3, 100, 7919, 50000) :
+            self.assertEqual(
+                [p for p in self.ref if p >= start],
+                list(takewhile(lambda n: n < self.bound,
+                               sequences.prime_generator_segmented(start)))
+            )
+
+    def test_primes(self) :
+        self.assertEqual(self.ref[:1000], list(islice(sequences.primes(), 1000)))
+
+class PrimeTableTest(unittest.TestCase) :
+    bounds = [0, 1, 2, 3, 10, 63, 64, 65, 128, 1000, 99991]
+
+    def setUp(self) :
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self) :
+        os.remove(self.path)
+
+    def test_prime_table(self) :
+        for n in self.bounds :
+            sequences.save_prime_table(self.path, n)
+            table = sequences.PrimeTable(self.path)
+            ref = [i for i in range(n + 1) if is_prime(i)]
+
+            self.assertEqual(n, table.limit)
+            self.assertEqual(ref, list(table))
+            self.assertEqual(len(ref), len(table))
+            self.assertEqual(ref, [i for i in range(-2, n + 10) if i in table])
+
+            if ref :
+                self.assertEqual(ref[-1], table[-1])
+
+            table.close()
+
+    def test_prime_table_wrong_file(self) :
+        with open(self.path, 'wb') as f :
+            f.write(b'\x00' * 64)
+
+        with self.assertRaises(ValueError) :
+            sequences.PrimeTable(self.path)
+
+class PrimeCountingTest(unittest.TestCase) :
+    known_values = {
+        0 : 0,
+        1 : 0,
+        2 : 1,
+        10 : 4,
+        100 : 25,
+        1000 : 168,
+        10**4 : 1229,
+        10**5 : 9592,
+        10**6 : 78498,
+        10**7 : 664579,
+        10**8 : 5761455,
+    }
+
+    known_nth_primes = {
+        1 : 2,
+        2 : 3,
+        5 : 11,
+        6 : 13,
+        10 : 29,
+        100 : 541,
+        1000 : 7919,
+        10**4 : 104729,
+        10**5 : 1299709,
+        10**6 : 15485863,
+    }
+
+    bound = 10000
+
+    def test_prime_pi_lucy(self) :
+        for x, pi in self.known_values.items() :
+            self.assertEqual(pi, sequences.prime_pi_lucy(x))
+
+    @unittest.skipIf(sequences.numpy is None, "numpy is not available")
+    def test_prime_pi_numpy(self) :
+        for x, pi in self.known_values.items() :
+            self.assertEqual(pi, sequences.prime_pi_numpy(x))
+
+    def test_prime_pi_against_sieve(self) :
+        count = 0
+        for x in range(self.bound // 4) :
+            count += is_prime(x)
+            self.assertEqual(count, sequences.prime_pi(x))
+
+    def test_nth_prime(self) :
+        for n, p in self.known_nth_primes.items() :
+            self.assertEqual(p, sequences.nth_prime(n))
+
+    def test_nth_prime_against_sieve(self) :
+        for n, p in enumerate(sequences.primes_until(self.bound), 1) :
+            self.assertEqual(p, sequences.nth_prime(n))
+
+    def test_nth_prime_wrong_values(self) :
+        for n in (0, -1) :
+            with self.assertRaises(ValueError) :
+                sequences.nth_prime(n)
+
 class PolygonalNumbersTest(unittest.TestCase) :
     known_triangular_numbers = {
         1 : 1,
@@ -1,9 +1,169 @@
 '''Tools to help time python code.'''
 
+import json
+import statistics
 import timeit
 
+def _format_time(seconds) :
+    '''Formats a duration in the most readable unit.'''
+
+    for unit, scale in (('sec', 1), ('msec', 1e-3), ('μsec', 1e-6)) :
+        if seconds >= scale :
+            return "{:.3g} {}".format(seconds / scale, unit)
+
+    return "{:.3g} nsec".format(seconds / 1e-9)
+
+class Measurement(object) :
+    '''The timings of a callable, as several samples of the time per call, each
+    averaged over the same number of loops.'''
+
+    def __init__(self, name, loops, samples) :
+        self.name = name
+        self.loops = loops
+        self.samples = list(samples)
+
+    @property
+    def min(self) :
+        return min(self.samples)
+
+    @property
+    def median(self) :
+        return statistics.median(self.samples)
+
+    @property
+    def mean(self) :
+        return statistics.mean(self.samples)
+
+    @property
+    def stddev(self) :
+        return statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0
+
+    def as_dict(self) :
+        '''Returns the measurement as a dictionary, ready to be serialized.'''
+
+        return {
+            'name' : self.name,
+            'loops' : self.loops,
+            'samples' : self.samples,
+            'min' : self.min,
+            'median' : self.median,
+            'stddev' : self.stddev,
+        }
+
+    def __str__(self) :
+        return "{}: {} loops x {} samples, {} min, {} median, {} stddev".format(
+            self.name, self.loops, len(self.samples), _format_time(self.min),
+            _format_time(self.median), _format_time(self.stddev)
+        )
+
+    def __repr__(self) :
+        return "Measurement({!r}, {!r}, {!r})".format(self.name, self.loops,
+                                                     self.samples)
+
+def _name(function) :
+    '''Returns a readable name for a callable.'''
+
+    return getattr(function, '__qualname__', None) or repr(function)
+
+def measure(function, *args, name = None, warmup = 1, repeat = 5,
+            loops = None, min_time = 0.05, **kwargs) :
+    '''Times calls of function(*args, **kwargs), and returns a Measurement.
+
+    The function is called warmup times first, untimed. Then repeat samples
+    are taken, each of loops calls. If loops isn't given, it is calibrated so
+    that each sample takes at least min_time seconds.
+    '''
+
+    if repeat < 1 :
+        raise ValueError("repeat must be positive, got {}.".format(repeat))
+
+    if loops is not None and loops < 1 :
+        raise ValueError("loops must be positive, got {}.".format(loops))
+
+    timer = timeit.Timer(lambda : function(*args, **kwargs))
+
+    for i in range(warmup) :
+        function(*args, **kwargs)
+
+    if loops is None :
+        loops = 1
+        while timer.timeit(loops) < min_time :
+            loops *= 2
+
+    samples = [t / loops for t in timer.repeat(repeat, loops)]
+
+    return Measurement(name or _name(function), loops, samples)
+
+_measure_options = ('warmup', 'repeat', 'loops', 'min_time')
+
+def compare(functions, *args, check = True, **options) :
+    '''Times several implementations of the same function on the same
+    arguments, and returns their Measurements, fastest first.
+
+    functions is either a dictionary from names to callables, or a list of
+    callables. Any options are passed on to measure, along with the arguments.
+    If check is true, the implementations must all return equal results, or
+    ValueError is raised.
+    '''
+
+    if not isinstance(functions, dict) :
+        functions = {_name(function) : function for function in functions}
+
+    # Options meant for measure, rather than for the functions.
+    kwargs = {key : value for key, value in options.items()
+              if key not in _measure_options}
+    options = {key : value for key, value in options.items()
+               if key in _measure_options}
+
+    if check :
+        results = {name : function(*args, **kwargs)
+                   for name, function in functions.items()}
+        expected = next(iter(results.values()), None)
+        for name, result in results.items() :
+            if result != expected :
+                raise ValueError("{} returned {!r}, but {} returned {!r}.".format(
+                    name, result, next(iter(results)), expected
+                ))
+
+    measurements = [measure(function, *args, name = name, **options, **kwargs)
+                    for name, function in functions.items()]
+
+    return sorted(measurements, key = lambda measurement : measurement.min)
+
+def format_table(measurements) :
+    '''Formats measurements as a table, with their speeds relative to the
+    fastest.'''
+
+    measurements = list(measurements)
+
+    if not measurements :
+        return ''
+
+    fastest = min(measurement.min for measurement in measurements)
+    width = max(len(measurement.name) for measurement in measurements)
+
+    lines = ["{:<{}}  {:>12}  {:>12}  {:>12}  {:>8}".format(
+        'name', width, 'min', 'median', 'stddev', 'relative'
+    )]
+
+    for measurement in measurements :
+        lines.append("{:<{}}  {:>12}  {:>12}  {:>12}  {:>7.2f}x".format(
+            measurement.name, width, _format_time(measurement.min),
+            _format_time(measurement.median), _format_time(measurement.stddev),
+            measurement.min / fastest if fastest else 1.0
+        ))
+
+    return '\n'.join(lines)
+
+def to_json(measurements, **options) :
+    '''Serializes measurements as a JSON list. Any options are passed on to
+    json.dumps.'''
+
+    return json.dumps([measurement.as_dict() for measurement in measurements],
+                      **options)
+
 class BasicTimer(object) :
-    '''A basic timer for callables, using timeit.'''
+    '''A basic timer for callables, which prints the time per call.'''
 
     def __init__(self, function, setup = '', runs = 1000) :
         self.function = function
@@ -11,21 +171,14 @@ class BasicTimer(object) :
         self.runs = runs
 
     def __call__(self, *args, **kwargs) :
-        execution_string = "{}(*{}, **{})".format(
-            self.function.__name__, args, kwargs
-        )
+        # A callable setup is called, and a string executed, once first.
+        if callable(self.setup) :
+            self.setup()
+        elif self.setup :
+            exec(self.setup, {})
 
-        setup_string = "from __main__ import {};".format(
-            self.function.__name__
-        ) + self.setup
+        self.measurement = measure(self.function, *args, loops = self.runs,
+                                   **kwargs)
 
-        self.timer = timeit.Timer(
-            execution_string,
-            setup_string,
-        )
-
-        print("{}: {} passes, {:.2f} μsec/pass".format(
-            self.function.__name__,
-            self.runs,
-            1000000 * self.timer.timeit(number = self.runs) / self.runs
-        ))
+        print(self.measurement)
+        return self.measurement
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from skynet import benchmarks, profile
+
+class BenchmarksTest(unittest.TestCase) :
+    def test_variants_agree(self) :
+        # compare checks that every variant returns the same results.
+        for family in benchmarks.families :
+            size = family.sizes[0]
+            variants = {name : variant.function
+                        for name, variant in family.variants.items()
+                        if size <= variant.limit}
+
+            self.assertIn(family.default, family.variants)
+            profile.compare(variants, *family.inputs(size), loops = 1, repeat = 1)
+
+    def test_run(self) :
+        results = benchmarks.run(['xgcd'], quick = True)
+
+        self.assertEqual(['xgcd'], list(results))
+        self.assertEqual([10, 100], sorted(results['xgcd']))
+        self.assertEqual({'recursive_xgcd', 'iterative_xgcd'},
+                         {m.name for m in results['xgcd'][10]})
+
+    def test_regressions(self) :
+        results = {'gcd' : {10 : [profile.Measurement('binary_gcd', 1, [2.0]),
+                                  profile.Measurement('lehmer_gcd', 1, [1.05])]}}
+        baseline = {'results' : {'gcd' : {'10' : {'binary_gcd' : 1.0,
+                                                  'lehmer_gcd' : 1.0}}}}
+
+        found = benchmarks.regressions(results, baseline)
+        self.assertEqual([('gcd', 10, 'binary_gcd', 1.0, 2.0)], found)
+        self.assertEqual(2, len(benchmarks.regressions(results, baseline, 0.01)))
+        self.assertEqual([], benchmarks.regressions(results, {'results' : {}}))
+
+    def test_baseline(self) :
+        results = {'gcd' : {10 : [profile.Measurement('binary_gcd', 1, [2.0, 1.5])]}}
+        path = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+
+        benchmarks.save_baseline(results, path)
+        baseline = benchmarks.load_baseline(path)
+
+        self.assertEqual({'gcd' : {'10' : {'binary_gcd' : 1.5}}}, baseline['results'])
+        self.assertEqual([], benchmarks.regressions(results, baseline))
+
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+    def test_recommendations(self) :
+        results = {
+            'gcd' : {
+                10 : [profile.Measurement('builtin_gcd', 1, [1.0])],
+                100 : [profile.Measurement('lehmer_gcd', 1, [1.0]),
+                       profile.Measurement('builtin_gcd', 1, [2.0])],
+            },
+            'xgcd' : {10 : [profile.Measurement('iterative_xgcd', 1, [1.0])]},
+        }
+
+        self.assertEqual([('gcd', 'builtin_gcd', 'lehmer_gcd')],
+                         benchmarks.recommendations(results))
+
+if __name__ == '__main__' :
+    unittest.main()
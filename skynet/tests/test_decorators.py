@@ -0,0 +1,189 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from skynet import decorators
+
+class MemoizeTest(unittest.TestCase) :
+    def setUp(self) :
+        self.calls = []
+
+    def square(self, n, offset = 0) :
+        self.calls.append((n, offset))
+        return n * n + offset
+
+    def test_memoize(self) :
+        square = decorators.memoize(self.square)
+
+        self.assertEqual(9, square(3))
+        self.assertEqual(9, square(3))
+        self.assertEqual(16, square(4))
+        self.assertEqual([(3, 0), (4, 0)], self.calls)
+        self.assertEqual(9, square.cache[(3,)])
+
+    def test_memoize_with_arguments(self) :
+        square = decorators.memoize(maxsize = 2)(self.square)
+
+        for n in (1, 2, 1, 3, 2) :
+            self.assertEqual(n * n, square(n))
+
+        # 2 was evicted by 3, as 1 was used more recently.
+        self.assertEqual([(1, 0), (2, 0), (3, 0), (2, 0)], self.calls)
+        self.assertEqual((1, 4, 2, 2, 2), tuple(square.cache_info()))
+
+    def test_memoize_kwargs(self) :
+        square = decorators.memoize(self.square)
+
+        self.assertEqual(10, square(3, offset = 1))
+        self.assertEqual(10, square(3, offset = 1))
+        self.assertEqual(11, square(3, offset = 2))
+        self.assertEqual(9, square(3))
+        self.assertEqual([(3, 1), (3, 2), (3, 0)], self.calls)
+
+    def test_cache_clear(self) :
+        square = decorators.memoize(self.square)
+
+        square(3)
+        square(3)
+        square.cache_clear()
+
+        self.assertEqual((0, 0, 0, None, 0), tuple(square.cache_info()))
+        square(3)
+        self.assertEqual(2, len(self.calls))
+
+    def test_recursion(self) :
+        @decorators.memoize
+        def fibonacci(n) :
+            return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+        self.assertEqual(354224848179261915075, fibonacci(100))
+        self.assertEqual(101, fibonacci.cache_info().misses)
+
+    def test_threads(self) :
+        square = decorators.memoize(maxsize = 50)(lambda n : n * n)
+
+        with ThreadPoolExecutor(8) as pool :
+            results = list(pool.map(square, [i % 100 for i in range(20000)]))
+
+        self.assertEqual([(i % 100)**2 for i in range(20000)], results)
+
+        # Hits may be undercounted, but nothing else.
+        info = square.cache_info()
+        self.assertLessEqual(info.hits + info.misses, 20000)
+        self.assertGreaterEqual(info.misses, 100)
+        self.assertEqual(50, info.currsize)
+
+    def test_wrong_values(self) :
+        with self.assertRaises(ValueError) :
+            decorators.memoize(maxsize = -1)
+
+class MemoizeDenseTest(unittest.TestCase) :
+    def test_memoize_dense(self) :
+        calls = []
+
+        @decorators.memoize_dense
+        def triangle(n) :
+            calls.append(n)
+            return 0 if n <= 0 else n + triangle(n - 1)
+
+        self.assertEqual(15, triangle(5))
+        self.assertEqual([0, 1, 2, 3, 4, 5], calls)
+        self.assertEqual([0, 1, 3, 6, 10, 15], triangle.cache)
+
+        self.assertEqual(10, triangle(4))
+        self.assertEqual(0, triangle(-3))
+        self.assertEqual([0, 1, 2, 3, 4, 5, -3], calls)
+
+        info = triangle.cache_info()
+        self.assertEqual((6, 6), (info.misses, info.currsize))
+
+        triangle.cache_clear()
+        self.assertEqual([], triangle.cache)
+        self.assertEqual(6, triangle(3))
+
+    def test_memoize_dense_depth(self) :
+        @decorators.memoize_dense
+        def steps(n) :
+            return 0 if n == 0 else steps(n - 1) + 1
+
+        # Far beyond the recursion limit, if it were recursive.
+        self.assertEqual(100000, steps(100000))
+
+class PersistentCacheTest(unittest.TestCase) :
+    def setUp(self) :
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.sqlite')
+        self.calls = []
+
+    def tearDown(self) :
+        self.directory.cleanup()
+
+    def memoized(self, cache, version = 0) :
+        # Each call stands for a new run of a program defining this function.
+        @decorators.memoize(persistent = cache, version = version)
+        def square(n, offset = 0) :
+            self.calls.append(n)
+            return n * n + offset
+
+        return square
+
+    def test_persistent_cache(self) :
+        cache = decorators.PersistentCache(self.path)
+
+        self.assertEqual([1, 4, 9], [self.memoized(cache)(n) for n in (1, 2, 3)])
+        self.assertEqual([1, 4, 9], [self.memoized(cache)(n) for n in (1, 2, 3)])
+        self.assertEqual([1, 2, 3], self.calls)
+        self.assertEqual(3, len(cache))
+
+        # Through a new connection to the same file.
+        square = self.memoized(self.path)
+        self.assertEqual(9, square(3))
+        self.assertEqual(10, square(3, offset = 1))
+        self.assertEqual([1, 2, 3, 3], self.calls)
+        self.assertEqual((1, 1, 0, None, 2), tuple(square.cache_info()))
+
+        cache.close()
+
+    def test_persistent_cache_version(self) :
+        cache = decorators.PersistentCache(self.path)
+
+        self.memoized(cache)(3)
+        self.memoized(cache, version = 2)(3)
+        self.memoized(cache, version = 2)(3)
+        self.assertEqual([3, 3], self.calls)
+
+        cache.close()
+
+    def test_persistent_cache_maxsize(self) :
+        cache = decorators.PersistentCache(self.path, maxsize = 3)
+        square = self.memoized(cache)
+
+        for n in range(10) :
+            square(n)
+
+        name = '{}.{}'.format(square.__module__, square.__qualname__)
+        self.assertEqual(3, len(cache))
+        self.assertEqual(81, cache.get(name, 0, (9,)))
+        self.assertIsNone(cache.get(name, 0, (0,)))
+
+        cache.close()
+
+    def test_persistent_cache_clear(self) :
+        cache = decorators.PersistentCache(self.path)
+        square = self.memoized(cache)
+
+        square(3)
+        square.cache_clear()
+        self.assertEqual(0, len(cache))
+
+        self.memoized(cache)(3)
+        self.assertEqual([3, 3], self.calls)
+
+        cache.close()
+
+    def test_persistent_cache_wrong_values(self) :
+        with self.assertRaises(ValueError) :
+            decorators.PersistentCache(self.path, maxsize = 0)
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -0,0 +1,49 @@
+import json
+import unittest
+from skynet import profile
+
+class MeasureTest(unittest.TestCase) :
+    def test_measure(self) :
+        calls = []
+        measurement = profile.measure(calls.append, 1, warmup = 2, repeat = 3,
+                                      loops = 10)
+
+        self.assertEqual(32, len(calls))
+        self.assertEqual('append', measurement.name.split('.')[-1])
+        self.assertEqual(10, measurement.loops)
+        self.assertEqual(3, len(measurement.samples))
+        self.assertLessEqual(measurement.min, measurement.median)
+        self.assertGreaterEqual(measurement.stddev, 0)
+
+    def test_measure_calibration(self) :
+        measurement = profile.measure(sum, range(10), repeat = 1, min_time = 0.001)
+
+        self.assertGreater(measurement.loops, 1)
+        self.assertGreaterEqual(measurement.loops * measurement.min, 0.0005)
+
+    def test_measure_wrong_values(self) :
+        for options in ({'repeat' : 0}, {'loops' : 0}) :
+            with self.assertRaises(ValueError) :
+                profile.measure(abs, 1, **options)
+
+    def test_compare(self) :
+        functions = {
+            'slow' : lambda n : sum(i for i in range(n)),
+            'fast' : lambda n : n * (n - 1) // 2,
+        }
+
+        measurements = profile.compare(functions, 1000, repeat = 2, min_time = 0.001)
+
+        self.assertEqual(['fast', 'slow'], [m.name for m in measurements])
+        self.assertIn('slow', profile.format_table(measurements))
+
+        data = json.loads(profile.to_json(measurements))
+        self.assertEqual(['fast', 'slow'], [m['name'] for m in data])
+        self.assertEqual(2, len(data[0]['samples']))
+
+    def test_compare_check(self) :
+        with self.assertRaises(ValueError) :
+            profile.compare([abs, lambda n : n], -3, loops = 1, repeat = 1)
+
+if __name__ == '__main__' :
+    unittest.main()